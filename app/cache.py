@@ -0,0 +1,150 @@
+import json
+import logging
+import threading
+from cachetools import TLRUCache
+from app.redis_client import redis_client, async_redis_client
+from app.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result tier", labels=("cache", "result"))
+
+MISSING = object()  # Sentinel: distinguishes "not cached" from a cached None
+
+
+class TwoTierCache:
+    """
+    Read-through cache with an in-process LRU in front of a shared Redis tier.
+    Values must be JSON-serializable; None is cached too (negative caching).
+    The local tier keeps a short TTL so entries changed by other workers age out quickly.
+    """
+
+    def __init__(self, namespace: str, maxsize: int, local_ttl: float, remote_ttl: float):
+        self.namespace = namespace
+        self.local_ttl = local_ttl
+        self.remote_ttl = remote_ttl
+        # Entries are (value, ttl) so each one can expire earlier than local_ttl
+        self._local = TLRUCache(maxsize=maxsize, ttu=lambda _key, entry, now: now + min(entry[1], self.local_ttl))
+        self._lock = threading.Lock()
+
+    def _redis_key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get_local(self, key):
+        """Return the value from the in-process tier only (no I/O), or MISSING."""
+        with self._lock:
+            entry = self._local.get(str(key))
+        if entry is None:
+            return MISSING
+        CACHE_REQUESTS.inc(cache=self.namespace, result="hit_local")
+        return entry[0]
+
+    def set_local(self, key, value, ttl: float = None):
+        """Store a value in the in-process tier only (no I/O)."""
+        with self._lock:
+            self._local[str(key)] = (value, ttl if ttl is not None else self.local_ttl)
+
+    def _counted(self, value, result: str, expected):
+        """Count a lookup; a cached value other than `expected` (when given) is a miss."""
+        if expected is not MISSING and value != expected:
+            value, result = MISSING, "miss"
+        CACHE_REQUESTS.inc(cache=self.namespace, result=result)
+        return value
+
+    def get(self, key, expected=MISSING):
+        """
+        Return the cached value, or MISSING.
+        With `expected`, only that exact value counts as a hit; anything else returns MISSING.
+        """
+        key = str(key)
+        with self._lock:
+            entry = self._local.get(key)
+        if entry is not None:
+            return self._counted(entry[0], "hit_local", expected)
+
+        try:
+            # One round trip for the value and its remaining TTL
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.get(self._redis_key(key))
+            pipe.ttl(self._redis_key(key))
+            raw, ttl = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error reading {self.namespace} cache from Redis: {e}")
+            raw = None
+
+        if raw is None:
+            return self._counted(MISSING, "miss", MISSING)
+
+        value = json.loads(raw)
+        with self._lock:
+            self._local[key] = (value, ttl if ttl and ttl > 0 else self.local_ttl)
+        return self._counted(value, "hit_redis", expected)
+
+    async def aget(self, key):
+        """Awaitable get() for the event loop: same tiers, Redis through the async pool."""
+        key = str(key)
+        value = self.get_local(key)
+        if value is not MISSING:
+            return value
+
+        try:
+            async with async_redis_client.pipeline(transaction=False) as pipe:
+                raw, ttl = await pipe.get(self._redis_key(key)).ttl(self._redis_key(key)).execute()
+        except Exception as e:
+            logger.error(f"Error reading {self.namespace} cache from Redis: {e}")
+            raw = None
+
+        if raw is None:
+            CACHE_REQUESTS.inc(cache=self.namespace, result="miss")
+            return MISSING
+
+        value = json.loads(raw)
+        with self._lock:
+            self._local[key] = (value, ttl if ttl and ttl > 0 else self.local_ttl)
+        CACHE_REQUESTS.inc(cache=self.namespace, result="hit_redis")
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        """Write a value through both tiers."""
+        key = str(key)
+        ttl = int(ttl if ttl is not None else self.remote_ttl)
+        if ttl <= 0:
+            self.delete(key)
+            return
+
+        with self._lock:
+            self._local[key] = (value, ttl)
+        try:
+            redis_client.setex(self._redis_key(key), ttl, json.dumps(value))
+        except Exception as e:
+            logger.error(f"Error writing {self.namespace} cache to Redis: {e}")
+
+    async def aset(self, key, value, ttl: float = None):
+        """Awaitable set() for the event loop."""
+        key = str(key)
+        ttl = int(ttl if ttl is not None else self.remote_ttl)
+        if ttl <= 0:
+            with self._lock:
+                self._local.pop(key, None)
+            try:
+                await async_redis_client.delete(self._redis_key(key))
+            except Exception as e:
+                logger.error(f"Error deleting {self.namespace} cache key from Redis: {e}")
+            return
+
+        with self._lock:
+            self._local[key] = (value, ttl)
+        try:
+            await async_redis_client.setex(self._redis_key(key), ttl, json.dumps(value))
+        except Exception as e:
+            logger.error(f"Error writing {self.namespace} cache to Redis: {e}")
+
+    def delete(self, key):
+        """Invalidate a key in both tiers."""
+        key = str(key)
+        with self._lock:
+            self._local.pop(key, None)
+        try:
+            redis_client.delete(self._redis_key(key))
+        except Exception as e:
+            logger.error(f"Error deleting {self.namespace} cache key from Redis: {e}")
@@ -0,0 +1,40 @@
+import time
+import anyio
+from app.config import BLOCKING_IO_THREADS
+from app.metrics import (
+    THREADPOOL_QUEUED, THREADPOOL_RUNNING, THREADPOOL_CALLS_TOTAL, THREADPOOL_WAIT_SECONDS, THREADPOOL_RUN_SECONDS
+)
+
+# 🔹 Bounded pool for the blocking Drive, OAuth, MySQL and Redis clients
+_limiter = anyio.CapacityLimiter(BLOCKING_IO_THREADS)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking (network-bound) call on the bounded worker pool so the event loop stays free.
+    Queue depth, wait time and run time are recorded per call.
+    """
+    call_name = getattr(func, "__name__", "call")
+    queued_at = time.perf_counter()
+    started = False
+
+    def instrumented():
+        nonlocal started
+        started = True
+        started_at = time.perf_counter()
+        THREADPOOL_QUEUED.dec()
+        THREADPOOL_RUNNING.inc()
+        THREADPOOL_WAIT_SECONDS.observe(started_at - queued_at)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            THREADPOOL_RUNNING.dec()
+            THREADPOOL_RUN_SECONDS.observe(time.perf_counter() - started_at, call=call_name)
+
+    THREADPOOL_QUEUED.inc()
+    THREADPOOL_CALLS_TOTAL.inc(call=call_name)
+    try:
+        return await anyio.to_thread.run_sync(instrumented, limiter=_limiter)
+    finally:
+        if not started:
+            THREADPOOL_QUEUED.dec()  # Cancelled while still waiting for a thread
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from sqlalchemy.engine.url import URL
 
@@ -26,8 +27,18 @@ if DB_CONFIG["password"]:
 else:
     DATABASE_URL = f"{DB_CONFIG['drivername']}://{DB_CONFIG['username']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
 
+# Same database through the async MySQL driver
+ASYNC_DATABASE_URL = DATABASE_URL.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+
 print("Database URL:", DATABASE_URL)  # Debugging purpose
 
+# 🔹 Database connection pool (applies to the sync and async engines)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # seconds; keep below MySQL wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+
 
 # 🔹 Google API Credentials
 CLIENT_ID = os.getenv("CLIENT_ID")
@@ -36,6 +47,11 @@ REDIRECT_URI = os.getenv("REDIRECT_URI")
 SCOPES = ["https://www.googleapis.com/auth/drive.file", "https://www.googleapis.com/auth/drive"]
 CENTRAL_DRIVE_FOLDER_ID = os.getenv("CENTRAL_DRIVE_FOLDER_ID")
 
+# 🔹 Google Endpoints (overridable to point at a fake server for benchmarks)
+GOOGLE_API_ROOT_URL = os.getenv("GOOGLE_API_ROOT_URL", "https://www.googleapis.com/")
+GOOGLE_TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+GOOGLE_REVOKE_URI = os.getenv("GOOGLE_REVOKE_URI", "https://accounts.google.com/o/oauth2/revoke")
+
 # 🔹 Security & Auth Config
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")  # Change this in production
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
@@ -50,5 +66,109 @@ PORT = int(os.getenv("PORT", 8000))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))  # seconds
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 100))  # per pool (sync and async) per worker
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))  # PING connections idle this long before reuse
+
+# 🔹 UserToken Cache (in-process LRU + Redis; local TTL bounds cross-worker staleness)
+USER_TOKEN_CACHE_SIZE = int(os.getenv("USER_TOKEN_CACHE_SIZE", 10000))
+USER_TOKEN_LOCAL_TTL = int(os.getenv("USER_TOKEN_LOCAL_TTL", 15))  # seconds
+USER_TOKEN_REDIS_TTL = int(os.getenv("USER_TOKEN_REDIS_TTL", 3600))  # seconds
+USER_TOKEN_NEGATIVE_TTL = int(os.getenv("USER_TOKEN_NEGATIVE_TTL", 30))  # seconds to remember "no token"
+
+# 🔹 /auth/status validation cache (capped by the token's own expiry)
+AUTH_STATUS_CACHE_TTL = int(os.getenv("AUTH_STATUS_CACHE_TTL", 300))  # seconds
+
+# 🔹 Drive Metadata Mirror (serve /drive/files from a local index synced via the Changes API)
+DRIVE_MIRROR_ENABLED = os.getenv("DRIVE_MIRROR_ENABLED", "False").lower() == "true"
+DRIVE_MIRROR_MAX_STALENESS = int(os.getenv("DRIVE_MIRROR_MAX_STALENESS", 30))  # seconds
+
+# 🔹 Folder tree index (/drive/tree/*: concurrent crawl into a materialized path/ancestry table)
+DRIVE_TREE_CRAWL_CONCURRENCY = int(os.getenv("DRIVE_TREE_CRAWL_CONCURRENCY", 8))  # folders listed in parallel
+DRIVE_TREE_MAX_STALENESS = int(os.getenv("DRIVE_TREE_MAX_STALENESS", 3600))  # seconds before reads recrawl
+DRIVE_TREE_MAX_NODES = int(os.getenv("DRIVE_TREE_MAX_NODES", 200000))  # crawl aborts beyond this many files + folders
+
+# 🔹 Background Token Refresh
+TOKEN_REFRESH_ENABLED = os.getenv("TOKEN_REFRESH_ENABLED", "True").lower() == "true"
+TOKEN_REFRESH_INTERVAL = int(os.getenv("TOKEN_REFRESH_INTERVAL", 60))  # seconds between scans
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", 300))  # refresh this long before expiry
+TOKEN_REFRESH_LOCK_TTL = int(os.getenv("TOKEN_REFRESH_LOCK_TTL", 30))  # seconds
+TOKEN_REFRESH_BATCH_SIZE = int(os.getenv("TOKEN_REFRESH_BATCH_SIZE", 100))  # users per scan
+
+# 🔹 Worker threads for blocking Drive/OAuth/MySQL/Redis calls made from async handlers
+BLOCKING_IO_THREADS = int(os.getenv("BLOCKING_IO_THREADS", 64))
+
+# 🔹 Outbound HTTP pool (shared by every call to Google)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))  # distinct hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 64))  # keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))  # seconds
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 120))  # seconds
+HTTP_TCP_KEEPALIVE = os.getenv("HTTP_TCP_KEEPALIVE", "True").lower() == "true"
+
+# 🔹 Request coalescing: identical concurrent Drive calls (listing pages, metadata, downloads) share one upstream call
+DRIVE_COALESCE_ENABLED = os.getenv("DRIVE_COALESCE_ENABLED", "True").lower() == "true"
+DRIVE_SHARED_DOWNLOAD_MAX_BYTES = int(os.getenv("DRIVE_SHARED_DOWNLOAD_MAX_BYTES", 64 * 1024 * 1024))  # larger downloads aren't shared
+DRIVE_SHARED_DOWNLOAD_DISK_BYTES = int(os.getenv("DRIVE_SHARED_DOWNLOAD_DISK_BYTES", 1024 * 1024 * 1024))  # temp disk for all shared downloads
+DRIVE_SHARED_DOWNLOAD_MAX_LEAD = int(os.getenv("DRIVE_SHARED_DOWNLOAD_MAX_LEAD", 16 * 1024 * 1024))  # fastest reader's lead over the slowest
+
+# 🔹 Drive quota scheduler (defaults follow Drive's 12,000 queries/min per project; keep per-user well below)
+DRIVE_QUOTA_GLOBAL_QPS = float(os.getenv("DRIVE_QUOTA_GLOBAL_QPS", 200))  # per worker process
+DRIVE_QUOTA_USER_QPS = float(os.getenv("DRIVE_QUOTA_USER_QPS", 20))
+DRIVE_QUOTA_BURST_SECONDS = float(os.getenv("DRIVE_QUOTA_BURST_SECONDS", 1))  # bucket capacity = qps * this
+DRIVE_RETRY_MAX_ATTEMPTS = int(os.getenv("DRIVE_RETRY_MAX_ATTEMPTS", 5))  # including the first try
+DRIVE_RETRY_BASE_DELAY = float(os.getenv("DRIVE_RETRY_BASE_DELAY", 0.5))  # seconds, doubled per attempt
+DRIVE_RETRY_MAX_DELAY = float(os.getenv("DRIVE_RETRY_MAX_DELAY", 32))  # seconds
+
+# 🔹 Drive Client Cache (per-user authorized clients, LRU + TTL)
+DRIVE_CLIENT_CACHE_SIZE = int(os.getenv("DRIVE_CLIENT_CACHE_SIZE", 1024))
+DRIVE_CLIENT_CACHE_TTL = int(os.getenv("DRIVE_CLIENT_CACHE_TTL", 1800))  # seconds
+
+# 🔹 Drive Uploads (resumable chunk size must be a multiple of 256 KiB)
+_UPLOAD_CHUNK_ALIGNMENT = 256 * 1024
+DRIVE_UPLOAD_CHUNK_SIZE = max(
+    _UPLOAD_CHUNK_ALIGNMENT,
+    int(os.getenv("DRIVE_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)) // _UPLOAD_CHUNK_ALIGNMENT * _UPLOAD_CHUNK_ALIGNMENT,
+)
+
+# 🔹 Batch Uploads (/drive/upload/batch)
+DRIVE_BATCH_UPLOAD_CONCURRENCY = int(os.getenv("DRIVE_BATCH_UPLOAD_CONCURRENCY", 4))
+DRIVE_PERMISSION_BATCH_SIZE = min(100, int(os.getenv("DRIVE_PERMISSION_BATCH_SIZE", 25)))  # Drive allows 100 calls per batch
+
+# 🔹 Background upload jobs (/drive/upload?background=true)
+UPLOAD_JOB_WORKERS = int(os.getenv("UPLOAD_JOB_WORKERS", 4))  # concurrent Drive uploads per worker process
+UPLOAD_JOB_TTL = int(os.getenv("UPLOAD_JOB_TTL", 86400))  # seconds job status stays queryable
+
+# 🔹 Resumable client uploads (/drive/uploads), relayed chunk by chunk into Google resumable sessions
+RESUMABLE_UPLOAD_SESSION_TTL = int(os.getenv("RESUMABLE_UPLOAD_SESSION_TTL", 7 * 24 * 3600))  # Google sessions last a week
+
+# 🔹 Drive Downloads (bytes fetched from Drive per upstream range request)
+DRIVE_DOWNLOAD_CHUNK_SIZE = int(os.getenv("DRIVE_DOWNLOAD_CHUNK_SIZE", 4 * 1024 * 1024))
+
+# 🔹 ZIP archive downloads (/drive/download-archive)
+DRIVE_ARCHIVE_CONCURRENCY = int(os.getenv("DRIVE_ARCHIVE_CONCURRENCY", 4))  # files fetched from Drive in parallel
+DRIVE_ARCHIVE_PREFETCH_FILES = int(os.getenv("DRIVE_ARCHIVE_PREFETCH_FILES", 8))  # files fetched ahead of the one being zipped
+DRIVE_ARCHIVE_SPOOL_MEMORY = int(os.getenv("DRIVE_ARCHIVE_SPOOL_MEMORY", 1024 * 1024))  # per file; larger ones spill to disk
+DRIVE_ARCHIVE_MAX_FILES = int(os.getenv("DRIVE_ARCHIVE_MAX_FILES", 1000))
+
+# 🔹 Export cache (Docs/Sheets/Slides exports on local disk, keyed by file version)
+EXPORT_CACHE_ENABLED = os.getenv("EXPORT_CACHE_ENABLED", "True").lower() == "true"
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "drive_export_cache"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 1024 * 1024 * 1024))  # LRU-evicted above this
+EXPORT_CACHE_EVICT_GRACE = int(os.getenv("EXPORT_CACHE_EVICT_GRACE", 60))  # seconds an entry is safe from eviction after use
+
+# 🔹 Streamed listing (/drive/files/stream)
+DRIVE_LIST_STREAM_PAGE_SIZE = min(1000, int(os.getenv("DRIVE_LIST_STREAM_PAGE_SIZE", 1000)))  # Drive's maximum pageSize
+DRIVE_LIST_PREFETCH_PAGES = int(os.getenv("DRIVE_LIST_PREFETCH_PAGES", 2))  # pages fetched ahead of the client
+
+# 🔹 Listing cursors for /drive/files (signed with SECRET_KEY; carry their own page history)
+DRIVE_LIST_CURSOR_HISTORY = int(os.getenv("DRIVE_LIST_CURSOR_HISTORY", 100))  # Pages a cursor can step back through
+DRIVE_LIST_MAX_PAGE_JUMP = int(os.getenv("DRIVE_LIST_MAX_PAGE_JUMP", 50))  # Pages walked at most to jump ahead
+
+# 🔹 Speculative next-page prefetch for /drive/files (cached per user + page token)
+DRIVE_PAGE_PREFETCH_ENABLED = os.getenv("DRIVE_PAGE_PREFETCH_ENABLED", "False").lower() == "true"
+DRIVE_PAGE_PREFETCH_DEPTH = int(os.getenv("DRIVE_PAGE_PREFETCH_DEPTH", 1))  # pages fetched ahead of each served page
+DRIVE_PAGE_PREFETCH_CONCURRENCY = int(os.getenv("DRIVE_PAGE_PREFETCH_CONCURRENCY", 8))  # prefetches running at once per worker
+DRIVE_PAGE_PREFETCH_TTL = int(os.getenv("DRIVE_PAGE_PREFETCH_TTL", 30))  # seconds a prefetched page stays servable
+DRIVE_PAGE_PREFETCH_CACHE_SIZE = int(os.getenv("DRIVE_PAGE_PREFETCH_CACHE_SIZE", 2048))
 
 print(REDIRECT_URI)
\ No newline at end of file
@@ -4,6 +4,7 @@ from fastapi.responses import JSONResponse, RedirectResponse
 from app.database import get_db
 from app.services.auth_service import generate_auth_url, handle_oauth_callback,check_google_auth_status_service,get_google_auth_token_service,disconnect_google_account
 from app.middleware import get_current_user
+from app.concurrency import run_blocking
 from fastapi import HTTPException
 from app.schemas.oauth_schema import OAuthCallbackRequest
 
@@ -20,7 +21,7 @@ async def google_auth(
     The frontend must provide `callback_url` as a query parameter.
     """
     try:
-        auth_url = generate_auth_url(user_id, callback_url)
+        auth_url = await generate_auth_url(user_id, callback_url)
         return JSONResponse(content={"authUrl": auth_url})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
@@ -43,7 +44,7 @@ async def google_auth_callback(
             raise ValueError("Missing authorization code or state.")
 
         # Attempt to process the OAuth callback
-        token, redirect_url = handle_oauth_callback(code, state, db)
+        token, redirect_url = await handle_oauth_callback(code, state, db)
         
         # Use default redirect if none is provided
         redirect_url = redirect_url or default_redirect_url
@@ -65,7 +66,7 @@ async def google_auth_callback_post(
     """
     try:
         # Process OAuth token exchange
-        token, _ = handle_oauth_callback(request.code, request.state, db)
+        token, _ = await handle_oauth_callback(request.code, request.state, db)
         return JSONResponse(content={"token": token})
 
     except Exception as e:
@@ -81,7 +82,7 @@ async def check_google_auth_status(
     Checks if the user's stored OAuth token is valid by making a test request to Google Drive API.
     If expired, it attempts to refresh it.
     """
-    is_connected = check_google_auth_status_service(db, user_id)
+    is_connected = await run_blocking(check_google_auth_status_service, db, user_id)
     return JSONResponse(content={"isConnected": is_connected})
 
 @router.get("/auth/token")
@@ -93,7 +94,7 @@ async def get_google_auth_token(
     Retrieves the stored Google OAuth token if it is valid.
     If expired, it tries to refresh it first.
     """
-    token = get_google_auth_token_service(db, user_id)
+    token = await run_blocking(get_google_auth_token_service, db, user_id)
     
     if token:
         return JSONResponse(content={"token": token})
@@ -110,7 +111,7 @@ async def disconnect_google_account_endpoint(
     Calls the service to revoke access and remove stored tokens.
     """
     try:
-        message = disconnect_google_account(db, user_id)
+        message = await run_blocking(disconnect_google_account, db, user_id)
         return {"message": message}
     except HTTPException as e:
         raise e
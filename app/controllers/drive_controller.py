@@ -1,60 +1,185 @@
-from fastapi import APIRouter, Depends, Query, UploadFile, File,HTTPException
+from typing import List
+from fastapi import APIRouter, Depends, Query, UploadFile, File,HTTPException, Header, Request
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.middleware import get_current_user
+from app.concurrency import run_blocking
 from app.services.drive_service import (
-    list_drive_files, upload_file_to_drive, create_google_file, download_file
+    list_drive_files, stream_drive_files, upload_file_to_drive, upload_files_to_drive_batch, create_google_file, download_file,
+    json_with_etag
+)
+from app.services.drive_mirror_service import list_mirrored_files
+from app.services.archive_service import download_archive
+from app.services.drive_tree_service import start_tree_crawl, get_subtree, get_folder_sizes, lookup_path
+from app.services.upload_job_service import submit_upload_job, get_upload_job
+from app.services.resumable_upload_service import (
+    create_upload_session, upload_chunk, query_upload_session, finalize_upload_session
 )
 from app.schemas.page_sechema import DrivePaginationRequest
+from app.config import DRIVE_MIRROR_ENABLED
 
 
 router = APIRouter()
 
 
-# @router.get("/drive/files")
-# async def get_drive_files(
-#     user_id: str = Depends(get_current_user),
-#     db: Session = Depends(get_db),
-#     page_token: str = Query(None, description="Token for fetching the next/previous page"),
-#     prev: bool = Query(False, description="Set to true to navigate to the previous page")
-# ):
-#     """
-#     Lists files from Google Drive, supporting pagination.
-#     - Use `page_token` to go to a specific page.
-#     - Use `prev=true` to go to the previous page.
-#     """
-#     try:
-#         result = list_drive_files(db, user_id, page_token, prev)
-#         return result
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-
 @router.get("/drive/files")
 async def get_drive_files(
-    page_token: str = Query(None),
+    pagination: DrivePaginationRequest = Depends(),
+    max_staleness: int = Query(None, ge=0, description="Mirror mode: maximum age in seconds of the local index"),
+    if_none_match: str = Header(None),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    List user's Google Drive files with automatic token refresh (ETag / 304 when the page is unchanged).
+    Page with `nextCursor` / `prevCursor` or jump with `page`; cursors are stateless, so any worker can serve them.
+    """
+    if DRIVE_MIRROR_ENABLED:
+        page = await run_blocking(
+            list_mirrored_files, db, user_id, pagination.cursor or pagination.page_token, max_staleness, pagination.page
+        )
+    else:
+        page = await run_blocking(list_drive_files, db, user_id, pagination.page_token, pagination.cursor, pagination.page)
+    return json_with_etag(page, if_none_match)
+
+@router.get("/drive/files/stream")
+async def stream_drive_files_endpoint(
+    fields: str = Query(None, description="Comma-separated file fields, e.g. 'id,name,size' (default: id, name, mimeType, webViewLink)"),
     user_id: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """List user's Google Drive files with automatic token refresh."""
-    return list_drive_files(db, user_id, page_token)
+    """Stream all of the user's files as NDJSON (one file per line), fetching pages ahead server-side."""
+    return await run_blocking(stream_drive_files, db, user_id, fields)
 
 @router.post("/drive/upload")
 async def upload_drive_file(
     file: UploadFile = File(...),
+    background: bool = Query(False, description="Return 202 with a job id right away and upload to Drive in the background"),
     user_id: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Upload a file to Google Drive, ensuring valid token."""
-    return upload_file_to_drive(db, user_id, file)
+    if background:
+        return await run_blocking(submit_upload_job, db, user_id, file)
+    return await run_blocking(upload_file_to_drive, db, user_id, file)
+
+@router.get("/drive/jobs/{job_id}")
+async def get_upload_job_endpoint(
+    job_id: str,
+    user_id: str = Depends(get_current_user),
+):
+    """Poll a background upload: stage, bytes sent and, once done, the file links."""
+    return await run_blocking(get_upload_job, user_id, job_id)
+
+@router.post("/drive/upload/batch")
+async def upload_drive_files_batch(
+    files: List[UploadFile] = File(...),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Upload many files at once; streams one NDJSON result per file as uploads finish."""
+    return await run_blocking(upload_files_to_drive_batch, db, user_id, files)
+
+@router.post("/drive/uploads")
+async def create_upload_session_endpoint(
+    file_name: str = Query(..., description="Name of the file in Drive"),
+    size: int = Query(..., gt=0, description="Total file size in bytes"),
+    content_type: str = Query(None, description="MIME type of the file"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Start a resumable upload; send the bytes with PUT /drive/uploads/{upload_id}?offset=N."""
+    return await run_blocking(create_upload_session, db, user_id, file_name, content_type, size)
+
+@router.put("/drive/uploads/{upload_id}")
+async def upload_chunk_endpoint(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset of this chunk (must equal the session's current offset)"),
+    content_length: int = Header(..., description="Chunk size in bytes"),
+    user_id: str = Depends(get_current_user),
+):
+    """Append a chunk; it is relayed to Google as it arrives. Returns the offset to continue from."""
+    return await run_blocking(upload_chunk, user_id, upload_id, offset, content_length, request.stream())
+
+@router.get("/drive/uploads/{upload_id}")
+async def query_upload_session_endpoint(
+    upload_id: str,
+    user_id: str = Depends(get_current_user),
+):
+    """Current offset of a resumable upload (ask after a dropped connection, then resume from it)."""
+    return await run_blocking(query_upload_session, user_id, upload_id)
+
+@router.post("/drive/uploads/{upload_id}/finalize")
+async def finalize_upload_session_endpoint(
+    upload_id: str,
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Finish a fully sent upload: set view-only access and return the file links."""
+    return await run_blocking(finalize_upload_session, db, user_id, upload_id)
 
 @router.get("/drive/download-file")
 async def download_drive_file_endpoint(
     file_id: str = Query(..., description="Google Drive File ID"),
+    range: str = Header(None, description="Optional byte range, e.g. 'bytes=0-1048575'"),
+    if_none_match: str = Header(None),
+    if_range: str = Header(None),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Download a file from Google Drive and return it as a stream (supports `Range`, `If-None-Match` and `If-Range`)."""
+    return await run_blocking(download_file, db, user_id, file_id, range, if_none_match, if_range)
+
+@router.get("/drive/download-archive")
+async def download_archive_endpoint(
+    file_ids: List[str] = Query(None, description="Google Drive File IDs (repeat the parameter)"),
+    folder_id: str = Query(None, description="Archive everything under this folder instead"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Download many files as one ZIP, streamed while the files are fetched from Drive in parallel."""
+    return await run_blocking(download_archive, db, user_id, file_ids, folder_id)
+
+@router.post("/drive/tree/crawl")
+async def crawl_drive_tree_endpoint(
+    folder_id: str = Query("root", description="Folder to index (default: all of My Drive)"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Crawl the folder tree now (folders are listed concurrently) and rebuild the user's tree index."""
+    return await run_blocking(start_tree_crawl, db, user_id, folder_id)
+
+@router.get("/drive/tree/subtree")
+async def drive_subtree_endpoint(
+    folder_id: str = Query(None, description="Folder ID (default: the crawled root)"),
+    max_depth: int = Query(None, ge=1, description="Levels below the folder to include"),
+    max_staleness: int = Query(None, ge=0, description="Recrawl first if the index is older than this many seconds"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Everything under a folder, from the tree index."""
+    return await run_blocking(get_subtree, db, user_id, folder_id, max_depth, max_staleness)
+
+@router.get("/drive/tree/sizes")
+async def drive_folder_sizes_endpoint(
+    folder_id: str = Query(None, description="Folder ID (default: the crawled root)"),
+    max_staleness: int = Query(None, ge=0, description="Recrawl first if the index is older than this many seconds"),
+    user_id: str = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Total size and file count of a folder and of each of its subfolders, from the tree index."""
+    return await run_blocking(get_folder_sizes, db, user_id, folder_id, max_staleness)
+
+@router.get("/drive/tree/path")
+async def drive_path_lookup_endpoint(
+    path: str = Query(..., description="Path relative to the crawled root, e.g. 'Projects/2024/report.pdf'"),
+    max_staleness: int = Query(None, ge=0, description="Recrawl first if the index is older than this many seconds"),
     user_id: str = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Download a file from Google Drive and return it as a stream."""
-    return download_file(db, user_id, file_id)
+    """Look up the file(s) or folder(s) at a path, from the tree index."""
+    return await run_blocking(lookup_path, db, user_id, path, max_staleness)
 
 @router.post("/drive/create-file")
 async def create_file_endpoint(
@@ -65,4 +190,4 @@ async def create_file_endpoint(
     db: Session = Depends(get_db),
 ):
     """API Endpoint to create a new Google Docs, Sheets, Slides, Forms, or Drawings file."""
-    return create_google_file(db, user_id, title, file_type, user_email)
+    return await run_blocking(create_google_file, db, user_id, title, file_type, user_email)
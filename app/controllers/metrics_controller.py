@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metrics import render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", tags=["Monitoring"])
+async def metrics():
+    """Expose process metrics in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
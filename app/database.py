@@ -1,17 +1,84 @@
 import os
-from sqlalchemy import create_engine, MetaData
+import time
+from sqlalchemy import create_engine, event, MetaData
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_TIMEOUT
+)
+from app.metrics import Histogram
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled MySQL connection", labels=("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "MySQL statement latency by statement type", labels=("engine", "statement"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, engine="sync")
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited for a connection."""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, engine="async")
+
+# Pool profile shared by the sync and async engines
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_recycle": DB_POOL_RECYCLE,  # Recycle before MySQL's idle timeout closes the connection
+    "pool_pre_ping": DB_POOL_PRE_PING,  # Detect stale connections on checkout
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
+
 # Create the SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
+
+# Async engine on an async MySQL driver (aiomysql)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **POOL_OPTIONS)
+
+def _instrument_queries(sync_engine, label: str):
+    """Time every statement by its verb (SELECT, INSERT, ...) so label cardinality stays bounded."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, engine=label, statement=(statement.split(None, 1) or ["?"])[0].upper())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+_instrument_queries(engine, "sync")
+_instrument_queries(async_engine.sync_engine, "async")
 
 # Session management
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # Base model
 Base = declarative_base()
@@ -22,4 +89,8 @@ def get_db():
     try:
         yield db  # ✅ Yields session to be used inside routes
     finally:
-        db.close()  # ✅ Ensures session is closed after request
\ No newline at end of file
+        db.close()  # ✅ Ensures session is closed after request
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db  # ✅ Awaitable session for async routes and repositories
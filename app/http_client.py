@@ -0,0 +1,194 @@
+import socket
+import time
+import httplib2
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from app.metrics import Counter, Histogram
+from app.scheduler import send_scheduled
+from app.config import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_TCP_KEEPALIVE, GOOGLE_API_ROOT_URL
+)
+
+# 🔹 One pooled keep-alive transport per worker for every outbound Google call
+# (googleapiclient, OAuth token exchange/refresh, token validation and revocation)
+
+HTTP_REQUESTS = Counter("outbound_http_requests_total", "Outbound HTTP requests sent through the shared pool", labels=("host",))
+HTTP_CONNECTIONS_OPENED = Counter(
+    "outbound_http_connections_opened_total", "New TCP/TLS connections opened by the shared pool (requests minus reuses)", labels=("host",)
+)
+
+GOOGLE_API_SECONDS = Histogram("google_api_call_duration_seconds", "Google API call latency by API method", labels=("method",))
+GOOGLE_API_ERRORS = Counter("google_api_errors_total", "Failed Google API calls by API method and HTTP status", labels=("method", "status"))
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS_OPENED.inc(host=self.host)
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS_OPENED.inc(host=self.host)
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with default timeouts, optional TCP keep-alive and connection-reuse accounting."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        if HTTP_TCP_KEEPALIVE:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        HTTP_REQUESTS.inc(host=urlsplit(request.url).hostname)
+        return super().send(request, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+
+
+http_adapter = PooledHTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+
+
+def use_shared_pool(session: requests.Session) -> requests.Session:
+    """Route a requests session (e.g. an OAuth2Session) through the shared connection pool."""
+    session.mount("https://", http_adapter)
+    session.mount("http://", http_adapter)
+    return session
+
+
+http_session = use_shared_pool(requests.Session())
+
+
+def scheduled_request(session: requests.Session, method: str, url: str, user_id: str = None, **kwargs) -> requests.Response:
+    """`session.request(...)` for a Drive API URL outside googleapiclient, sent through the outbound scheduler."""
+    sent = {}
+
+    def send():
+        response = sent["response"] = session.request(method, url, **kwargs)
+        return response.status_code, {key.lower(): value for key, value in response.headers.items()}, response.content
+
+    send_scheduled(send, user_id, url, method, kwargs.get("data"))
+    return sent["response"]
+
+
+class RequestsHttp:
+    """
+    httplib2.Http-compatible transport for googleapiclient backed by the shared requests session.
+    Unlike httplib2.Http it is safe to share between threads.
+    """
+
+    def __init__(self, session: requests.Session = http_session, user_id: str = None):
+        self.session = session
+        self.user_id = user_id  # Quota bucket for Drive calls (see app.scheduler)
+        self.timeout = None
+        self.follow_redirects = True
+        self.redirect_codes = httplib2.REDIRECT_CODES
+        self.connections = {}
+
+    def _send(self, uri, method, body, headers, redirections):
+        response = self.session.request(
+            method,
+            uri,
+            data=body,
+            headers=headers,
+            timeout=(HTTP_CONNECT_TIMEOUT, self.timeout) if self.timeout else None,
+            allow_redirects=self.follow_redirects and redirections > 0,
+        )
+        info = {key.lower(): value for key, value in response.headers.items()}
+        return response, info
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=httplib2.DEFAULT_MAX_REDIRECTS, connection_type=None):
+        if uri.startswith(GOOGLE_API_ROOT_URL):
+            # Drive API calls wait for quota and are retried on rate limits; token endpoints go straight out
+            sent = {}
+
+            def send():
+                sent["response"], sent["info"] = self._send(uri, method, body, headers, redirections)
+                return sent["response"].status_code, sent["info"], sent["response"].content
+
+            send_scheduled(send, self.user_id, uri, method, body)
+            response, info = sent["response"], sent["info"]
+        else:
+            response, info = self._send(uri, method, body, headers, redirections)
+        # requests already decoded the body, so drop the encoding like httplib2 does
+        if "content-encoding" in info:
+            info["-content-encoding"] = info.pop("content-encoding")
+        info["status"] = str(response.status_code)
+        http_response = httplib2.Response(info)
+        http_response.reason = response.reason
+        return http_response, response.content
+
+    def close(self):
+        """Connections belong to the shared pool; nothing to close per client."""
+
+
+class TimedMediaHttp:
+    """
+    Wraps a media request's http so each chunk request made outside HttpRequest.execute (ranged get_media,
+    MediaIoBaseDownload for exports) is timed and error-counted per API method, like InstrumentedHttpRequest.
+    """
+
+    def __init__(self, http, method: str):
+        self.http = http
+        self.method = method
+
+    def request(self, uri, method="GET", **kwargs):
+        started = time.perf_counter()
+        try:
+            response, content = self.http.request(uri, method=method, **kwargs)
+        except Exception:
+            GOOGLE_API_ERRORS.inc(method=self.method, status="transport")
+            raise
+        finally:
+            GOOGLE_API_SECONDS.observe(time.perf_counter() - started, method=self.method)
+        if response.status not in (200, 206):
+            GOOGLE_API_ERRORS.inc(method=self.method, status=response.status)
+        return response, content
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+def timed_media(request):
+    """Instrument a get_media / export_media request's chunk requests (see TimedMediaHttp); returns the request."""
+    if not isinstance(request.http, TimedMediaHttp):
+        request.http = TimedMediaHttp(request.http, getattr(request, "methodId", None) or "unknown")
+    return request
+
+
+class InstrumentedHttpRequest(HttpRequest):
+    """
+    googleapiclient request (passed as requestBuilder) that records latency and errors per API method,
+    e.g. drive.files.list. Resumable uploads are timed per chunk; media downloads go through TimedMediaHttp.
+    """
+
+    def _timed(self, call, *args, **kwargs):
+        method = self.methodId or "unknown"
+        started = time.perf_counter()
+        try:
+            return call(*args, **kwargs)
+        except HttpError as error:
+            GOOGLE_API_ERRORS.inc(method=method, status=error.resp.status)
+            raise
+        except Exception:
+            GOOGLE_API_ERRORS.inc(method=method, status="transport")
+            raise
+        finally:
+            GOOGLE_API_SECONDS.observe(time.perf_counter() - started, method=method)
+
+    def execute(self, http=None, num_retries=0):
+        return self._timed(super().execute, http=http, num_retries=num_retries)
+
+    def next_chunk(self, http=None, num_retries=0):
+        return self._timed(super().next_chunk, http=http, num_retries=num_retries)
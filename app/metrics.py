@@ -0,0 +1,119 @@
+import bisect
+import threading
+
+# 🔹 Minimal in-process metrics registry, rendered in Prometheus text format by /metrics
+
+_registry = []
+
+
+def _format_labels(label_names, label_values):
+    if not label_names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(label_names, label_values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds (seconds by default)."""
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, description: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, amount: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        names = self.label_names + ("le",)
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# 🔹 Drive transfer metrics
+UPLOAD_BYTES_IN_FLIGHT = Gauge("drive_upload_bytes_in_flight", "Upload bytes read from clients and not yet acknowledged by Google")
+UPLOAD_BYTES_TOTAL = Counter("drive_upload_bytes_total", "Bytes uploaded to Google Drive")
+DOWNLOAD_BYTES_TOTAL = Counter("drive_download_bytes_total", "Bytes downloaded from Google Drive")
+
+# 🔹 Blocking-call thread pool
+THREADPOOL_QUEUED = Gauge("threadpool_calls_queued", "Blocking calls waiting for a worker thread")
+THREADPOOL_RUNNING = Gauge("threadpool_calls_running", "Blocking calls currently running on a worker thread")
+THREADPOOL_CALLS_TOTAL = Counter("threadpool_calls_total", "Blocking calls offloaded from the event loop", labels=("call",))
+THREADPOOL_WAIT_SECONDS = Histogram("threadpool_wait_seconds", "Time blocking calls spent queued before a thread picked them up")
+THREADPOOL_RUN_SECONDS = Histogram("threadpool_run_seconds", "Time blocking calls spent running on a worker thread", labels=("call",))
@@ -1,7 +1,9 @@
+import time
 from fastapi import Request, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.repositories.user_repo import get_user_by_token
+from app.metrics import Gauge, Histogram
 
 async def get_current_user(request: Request, db: Session = Depends(get_db)):
     """
@@ -17,3 +19,47 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Invalid User-ID format")
 
     return user_id or 1  # ✅ Use extracted user_id or fallback to 1
+
+
+# 🔹 Request metrics (pure ASGI so streamed responses are timed until their last byte)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served")
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status", labels=("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    """
+    Records latency and in-flight requests per route template (e.g. /drive/download-file),
+    never per raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route.path if route else "unmatched",
+                status=status,
+            )
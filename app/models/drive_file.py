@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, DateTime, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+class DriveFile(Base):
+    """Local mirror of a user's Drive file metadata, kept current through the Changes API."""
+    __tablename__ = "drive_files"
+
+    user_id = Column(String(255), primary_key=True)
+    file_id = Column(String(255), primary_key=True)
+    name = Column(String(1024), nullable=False)
+    mime_type = Column(String(255), nullable=True)
+    web_view_link = Column(String(2048), nullable=True)
+    modified_time = Column(DateTime, nullable=True)
+    parents = Column(JSON, nullable=True)  # ✅ List of parent folder IDs
+    md5_checksum = Column(String(32), nullable=True)
+
+    __table_args__ = (
+        Index("ix_drive_files_user_modified", "user_id", "modified_time"),
+    )
+
+class DriveSyncState(Base):
+    """Per-user mirror cursor: the Changes API page token to resume from and when we last caught up."""
+    __tablename__ = "drive_sync_state"
+
+    user_id = Column(String(255), primary_key=True)
+    start_page_token = Column(String(255), nullable=False)
+    last_synced_at = Column(DateTime, default=datetime.utcnow)
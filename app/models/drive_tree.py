@@ -0,0 +1,39 @@
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, BigInteger, Float, Text, Index
+from datetime import datetime
+from app.database import Base
+
+class DriveTreeNode(Base):
+    """One file or folder of a user's crawled folder tree, with its materialized path and ancestry."""
+    __tablename__ = "drive_tree_nodes"
+
+    user_id = Column(String(255), primary_key=True)
+    file_id = Column(String(255), primary_key=True)
+    parent_id = Column(String(255), nullable=True)  # None for the crawl root
+    name = Column(String(1024), nullable=False)
+    mime_type = Column(String(255), nullable=True)
+    is_folder = Column(Boolean, nullable=False, default=False)
+    size = Column(BigInteger, nullable=True)  # ✅ Files: bytes; folders: total bytes of every file beneath
+    file_count = Column(Integer, nullable=True)  # ✅ Folders: number of files beneath (recursive)
+    depth = Column(Integer, nullable=False)  # 0 for the crawl root
+    ancestry = Column(String(2048), nullable=False)  # "/<root id>/<child id>/.../": ancestors, root first
+    path = Column(Text, nullable=False)  # "Folder/Sub/name" relative to the crawl root ("" for the root)
+    path_hash = Column(String(64), nullable=False)  # sha256 of path, for indexed path lookups
+    modified_time = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Subtrees are ancestry prefix scans
+        Index("ix_drive_tree_nodes_user_ancestry", "user_id", "ancestry", mysql_length={"ancestry": 255}),
+        Index("ix_drive_tree_nodes_user_path", "user_id", "path_hash"),
+        Index("ix_drive_tree_nodes_user_parent", "user_id", "parent_id"),
+    )
+
+class DriveTreeCrawl(Base):
+    """Per-user record of the last folder tree crawl: which folder was indexed, how much, and when."""
+    __tablename__ = "drive_tree_crawls"
+
+    user_id = Column(String(255), primary_key=True)
+    root_id = Column(String(255), nullable=False)
+    folder_count = Column(Integer, nullable=False, default=0)
+    file_count = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(Float, nullable=True)
+    crawled_at = Column(DateTime, default=datetime.utcnow)
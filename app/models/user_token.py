@@ -8,4 +8,10 @@ class UserToken(Base):
     user_id = Column(String(255), primary_key=True, index=True)  # ✅ Specify length
     access_token = Column(String(2048), nullable=False)  # ✅ Specify length (Longer for OAuth tokens)
     refresh_token = Column(String(2048), nullable=True)  # ✅ Optional, but still needs a length
+    expires_at = Column(DateTime, nullable=True, index=True)  # ✅ Access token expiry (UTC), drives proactive refresh
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def has_refresh_token(self) -> bool:
+        """Cached copies never carry the refresh token itself, only this flag (see user_repo._serialize_token)."""
+        return bool(self.refresh_token) or getattr(self, "_has_refresh_token", False)
@@ -0,0 +1,96 @@
+import time
+import logging
+import redis
+import redis.asyncio
+from redis.client import Pipeline
+from redis.asyncio.client import Pipeline as AsyncPipeline
+from app.config import REDIS_URL, REDIS_SOCKET_TIMEOUT, REDIS_MAX_CONNECTIONS, REDIS_HEALTH_CHECK_INTERVAL
+from app.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_duration_seconds", "Redis round-trip latency by command (pipelines as PIPELINE)", labels=("command",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0),
+)
+REDIS_ERRORS = Counter("redis_errors_total", "Failed Redis commands by command", labels=("command",))
+
+# Fail fast so a Redis outage never stalls a request; idle connections are PINGed before reuse
+POOL_OPTIONS = {
+    "decode_responses": True,
+    "max_connections": REDIS_MAX_CONNECTIONS,
+    "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+    "socket_timeout": REDIS_SOCKET_TIMEOUT,
+    "socket_connect_timeout": REDIS_SOCKET_TIMEOUT,
+}
+
+
+def _timed(command: str, call, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return call(*args, **kwargs)
+    except redis.RedisError:
+        REDIS_ERRORS.inc(command=command)
+        raise
+    finally:
+        REDIS_COMMAND_SECONDS.observe(time.perf_counter() - started, command=command)
+
+
+async def _timed_async(command: str, call, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return await call(*args, **kwargs)
+    except redis.RedisError:
+        REDIS_ERRORS.inc(command=command)
+        raise
+    finally:
+        REDIS_COMMAND_SECONDS.observe(time.perf_counter() - started, command=command)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline whose round trip is timed as a single PIPELINE command."""
+
+    def execute(self, raise_on_error=True):
+        return _timed("PIPELINE", super().execute, raise_on_error)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records latency and errors for every command it sends."""
+
+    def execute_command(self, *args, **options):
+        return _timed(str(args[0]).upper(), super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedAsyncPipeline(AsyncPipeline):
+    async def execute(self, raise_on_error=True):
+        return await _timed_async("PIPELINE", super().execute, raise_on_error)
+
+
+class InstrumentedAsyncRedis(redis.asyncio.Redis):
+    """Async counterpart of InstrumentedRedis for code running on the event loop."""
+
+    async def execute_command(self, *args, **options):
+        return await _timed_async(str(args[0]).upper(), super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# Shared Redis clients (OAuth state, caches, locks), each on an explicit bounded connection pool
+redis_pool = redis.ConnectionPool.from_url(REDIS_URL, **POOL_OPTIONS)
+redis_client = InstrumentedRedis(connection_pool=redis_pool)
+
+async_redis_pool = redis.asyncio.ConnectionPool.from_url(REDIS_URL, **POOL_OPTIONS)
+async_redis_client = InstrumentedAsyncRedis(connection_pool=async_redis_pool)
+
+
+async def check_redis() -> bool:
+    """Startup health check: PING through the async pool."""
+    try:
+        return await async_redis_client.ping()
+    except Exception as e:
+        logger.error(f"Redis health check failed: {e}")
+        return False
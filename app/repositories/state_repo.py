@@ -1,36 +1,32 @@
-import redis
 import logging
-from app.config import REDIS_URL
+from redis.exceptions import ResponseError
+from app.redis_client import async_redis_client
 
 logger = logging.getLogger(__name__)
 
-# Initialize Redis
-redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-
-def save_state(state: str, user_id: str, expiry: int = 300):
+async def save_state(state: str, user_id: str, expiry: int = 300):
     """
     Stores the OAuth state for a user with a time limit.
     """
     try:
-        redis_client.setex(f"oauth_state:{state}", expiry, user_id)
+        await async_redis_client.setex(f"oauth_state:{state}", expiry, user_id)
     except Exception as e:
         logger.error(f"Error saving OAuth state: {e}")
 
-def get_user_id_by_state(state: str):
+async def pop_user_id_by_state(state: str):
     """
-    Retrieves user_id associated with the OAuth state.
+    Retrieves and removes the value stored for an OAuth state in one atomic step,
+    so a state can never be redeemed twice.
     """
+    key = f"oauth_state:{state}"
     try:
-        return redis_client.get(f"oauth_state:{state}")
+        try:
+            return await async_redis_client.getdel(key)
+        except ResponseError:
+            # Redis < 6.2 has no GETDEL: same effect with a MULTI/EXEC pipeline
+            async with async_redis_client.pipeline(transaction=True) as pipe:
+                value, _ = await pipe.get(key).delete(key).execute()
+            return value
     except Exception as e:
         logger.error(f"Error retrieving user_id from state: {e}")
         return None
-
-def delete_state(state: str):
-    """
-    Removes the OAuth state after it's used.
-    """
-    try:
-        redis_client.delete(f"oauth_state:{state}")
-    except Exception as e:
-        logger.error(f"Error deleting OAuth state: {e}")
@@ -1,37 +1,102 @@
-import requests
+from datetime import datetime, timedelta
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user_token import UserToken
 from fastapi import HTTPException
-from app.config import CLIENT_ID,CLIENT_SECRET
+from app.config import CLIENT_ID,CLIENT_SECRET,GOOGLE_TOKEN_URI
+from app.config import USER_TOKEN_CACHE_SIZE, USER_TOKEN_LOCAL_TTL, USER_TOKEN_REDIS_TTL, USER_TOKEN_NEGATIVE_TTL, AUTH_STATUS_CACHE_TTL
+from app.cache import TwoTierCache, MISSING
+from app.http_client import http_session
+from app.services.drive_client_cache import invalidate_drive_client
+
+# user_id -> serialized UserToken row without its refresh token (or None when the user has no token)
+token_cache = TwoTierCache("user_token", USER_TOKEN_CACHE_SIZE, USER_TOKEN_LOCAL_TTL, USER_TOKEN_REDIS_TTL)
+# user_id -> access token last confirmed valid by Google (see auth_service.validate_google_token)
+token_validation_cache = TwoTierCache("token_validation", USER_TOKEN_CACHE_SIZE, USER_TOKEN_LOCAL_TTL, AUTH_STATUS_CACHE_TTL)
+
+def _serialize_token(user_token: UserToken):
+    """Cacheable form of a token row. The refresh token stays in MySQL; the cache only records that one exists."""
+    return {
+        "user_id": user_token.user_id,
+        "access_token": user_token.access_token,
+        "has_refresh_token": user_token.has_refresh_token,
+        "expires_at": user_token.expires_at.isoformat() if user_token.expires_at else None,
+        "created_at": user_token.created_at.isoformat() if user_token.created_at else None,
+    }
+
+def _deserialize_token(data: dict):
+    """Rebuild a detached (read-only) UserToken from its cached form."""
+    user_token = UserToken(
+        user_id=data["user_id"],
+        access_token=data["access_token"],
+        expires_at=datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None,
+        created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+    )
+    user_token._has_refresh_token = bool(data.get("has_refresh_token"))
+    return user_token
 
 def get_user_token(db: Session, user_id: str):
-    return db.query(UserToken).filter(UserToken.user_id == user_id).first()
+    """Read-through lookup of a user's token row: local LRU, then Redis, then MySQL."""
+    cached = token_cache.get(user_id)
+    if cached is not MISSING:
+        return _deserialize_token(cached) if cached else None
+
+    user_token = db.query(UserToken).filter(UserToken.user_id == str(user_id)).first()
+    if user_token:
+        token_cache.set(user_id, _serialize_token(user_token))
+    else:
+        token_cache.set(user_id, None, ttl=USER_TOKEN_NEGATIVE_TTL)
+    return user_token
+
+async def get_user_token_async(db: AsyncSession, user_id: str):
+    """Awaitable get_user_token for async routes: local LRU, then Redis (async pool), then MySQL via the async engine."""
+    cached = await token_cache.aget(user_id)
+    if cached is not MISSING:
+        return _deserialize_token(cached) if cached else None
+
+    result = await db.execute(select(UserToken).where(UserToken.user_id == str(user_id)))
+    user_token = result.scalars().first()
+    if user_token:
+        await token_cache.aset(user_id, _serialize_token(user_token))
+    else:
+        await token_cache.aset(user_id, None, ttl=USER_TOKEN_NEGATIVE_TTL)
+    return user_token
+
+async def get_user_google_token_async(db: AsyncSession, user_id: str):
+    """Awaitable get_user_google_token."""
+    token_entry = await get_user_token_async(db, user_id)
+    return token_entry.access_token if token_entry else None
 
 def get_user_by_token(db: Session, user_id: str):
     """Retrieve user authentication details by user ID."""
-    return db.query(UserToken).filter(UserToken.user_id == user_id).first()
+    return get_user_token(db, user_id)
 
 def get_user_google_token(db: Session, user_id: str):
     """
     Retrieve the user's stored Google OAuth access token.
     """
-    token_entry = db.query(UserToken).filter(UserToken.user_id == user_id).first()
+    token_entry = get_user_token(db, user_id)
     return token_entry.access_token if token_entry else None
 
-def save_user_token(db: Session, user_id: str, access_token: str, refresh_token: str = None):
-    """Save or update user authentication tokens in the database."""
+def save_user_token(db: Session, user_id: str, access_token: str, refresh_token: str = None, expires_at: datetime = None):
+    """Save or update user authentication tokens (and the access token's UTC expiry) in the database."""
     user_token = db.query(UserToken).filter(UserToken.user_id == user_id).first()
 
     if user_token:
         user_token.access_token = access_token
+        user_token.expires_at = expires_at
         if refresh_token:
             user_token.refresh_token = refresh_token
     else:
-        user_token = UserToken(user_id=user_id, access_token=access_token, refresh_token=refresh_token)
+        user_token = UserToken(user_id=user_id, access_token=access_token, refresh_token=refresh_token, expires_at=expires_at)
         db.add(user_token)
     
     db.commit()
     db.refresh(user_token)
+    token_cache.set(user_id, _serialize_token(user_token))  # Write-through
+    token_validation_cache.delete(user_id)
+    invalidate_drive_client(user_id)
     return user_token
 
 def remove_invalid_token(db: Session, user_id: str):
@@ -40,6 +105,9 @@ def remove_invalid_token(db: Session, user_id: str):
     """
     db.query(UserToken).filter(UserToken.user_id == user_id).delete()
     db.commit()
+    token_cache.delete(user_id)
+    token_validation_cache.delete(user_id)
+    invalidate_drive_client(user_id)
 
 def refresh_access_token(db: Session, user_id: str):
     """
@@ -50,7 +118,7 @@ def refresh_access_token(db: Session, user_id: str):
     if not user_token or not user_token.refresh_token:
         raise HTTPException(status_code=401, detail="User not authenticated or missing refresh token")
     
-    token_url = "https://oauth2.googleapis.com/token"
+    token_url = GOOGLE_TOKEN_URI
     payload = {
         "client_id": CLIENT_ID,
         "client_secret": CLIENT_SECRET,
@@ -58,12 +126,17 @@ def refresh_access_token(db: Session, user_id: str):
         "grant_type": "refresh_token",
     }
 
-    response = requests.post(token_url, data=payload)
+    response = http_session.post(token_url, data=payload)
     if response.status_code == 200:
         new_tokens = response.json()
-        save_user_token(db, user_id, new_tokens["access_token"], user_token.refresh_token)
+        expires_at = datetime.utcnow() + timedelta(seconds=new_tokens.get("expires_in", 3600))
+        save_user_token(db, user_id, new_tokens["access_token"], user_token.refresh_token, expires_at)
         return new_tokens["access_token"]
-    
+
+    elif response.status_code in [400, 401]:
+        remove_invalid_token(db, user_id)  # ❌ Refresh token rejected (invalid_grant), remove old token
+        raise HTTPException(status_code=401, detail="Failed to refresh access token")
+
     else:
-        remove_invalid_token(db, user_id)  # ❌ Token refresh failed, remove old token
-        raise HTTPException(status_code=401, detail="Failed to refresh access token")
\ No newline at end of file
+        # Google-side failure: keep the refresh token so a later attempt can succeed
+        raise HTTPException(status_code=502, detail="Google token endpoint unavailable")
\ No newline at end of file
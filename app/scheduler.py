@@ -0,0 +1,197 @@
+import time
+import json
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.metrics import Counter, Gauge, Histogram
+from app.config import (
+    DRIVE_QUOTA_GLOBAL_QPS, DRIVE_QUOTA_USER_QPS, DRIVE_QUOTA_BURST_SECONDS,
+    DRIVE_RETRY_MAX_ATTEMPTS, DRIVE_RETRY_BASE_DELAY, DRIVE_RETRY_MAX_DELAY
+)
+
+# 🔹 Outbound scheduler for Drive calls: global + per-user token buckets sized to Drive's quotas,
+# priority classes (interactive calls go before bulk transfers) and jittered backoff on rate limits.
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+_PRIORITY_ORDER = (INTERACTIVE, BULK)
+
+SCHEDULER_QUEUED = Gauge("drive_scheduler_queued", "Drive calls waiting for a quota token", labels=("priority",))
+SCHEDULER_WAIT_SECONDS = Histogram("drive_scheduler_wait_seconds", "Time Drive calls waited for a quota token", labels=("priority",))
+SCHEDULER_THROTTLED = Counter(
+    "drive_scheduler_throttled_total", "Throttle events: local quota waits and upstream rate limits", labels=("reason",)
+)
+SCHEDULER_RETRIES = Counter("drive_scheduler_retries_total", "Drive calls retried after a rate limit or server error", labels=("status",))
+
+RATE_LIMIT_REASONS = {"userRateLimitExceeded", "rateLimitExceeded"}
+SERVER_ERROR_STATUSES = {500, 502, 503, 504}
+# A 5xx may arrive after Google already acted (e.g. files.create), so only these are resent after one
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_priority = ContextVar("drive_call_priority", default=None)
+
+
+@contextmanager
+def outbound_priority(priority: str):
+    """Run Drive calls made inside the block (on this thread/context) with the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority(uri: str) -> str:
+    """Explicit priority if one was set, else uploads are bulk and everything else interactive."""
+    return _priority.get() or (BULK if "/upload/" in uri else INTERACTIVE)
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`. Not thread-safe: guarded by the scheduler's lock."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # Set when Google says this bucket's quota is exhausted
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 when one is available now)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class OutboundScheduler:
+    def __init__(self, global_qps: float, user_qps: float, burst_seconds: float):
+        self.user_qps = user_qps
+        self.user_capacity = max(1.0, user_qps * burst_seconds)
+        self.global_bucket = TokenBucket(global_qps, max(1.0, global_qps * burst_seconds))
+        self.user_buckets = {}
+        self.waiting = {priority: 0 for priority in _PRIORITY_ORDER}
+        self._condition = threading.Condition()
+
+    def _user_bucket(self, user_id) -> TokenBucket:
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            bucket = self.user_buckets[user_id] = TokenBucket(self.user_qps, self.user_capacity)
+        return bucket
+
+    def _prune(self, now: float):
+        """Forget users whose bucket is full again (idle) so the map doesn't grow without bound."""
+        if len(self.user_buckets) > 10000:
+            for user_id, bucket in list(self.user_buckets.items()):
+                if bucket.wait_time(now) == 0 and bucket.tokens >= bucket.capacity:
+                    del self.user_buckets[user_id]
+
+    def acquire(self, user_id, priority: str = INTERACTIVE):
+        """Block until both the global and the user's bucket have a token and no higher-priority call is waiting."""
+        started = time.monotonic()
+        higher = _PRIORITY_ORDER[:_PRIORITY_ORDER.index(priority)]
+        with self._condition:
+            self.waiting[priority] += 1
+            SCHEDULER_QUEUED.inc(priority=priority)
+            throttled = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    user_bucket = self._user_bucket(user_id) if user_id is not None else None
+                    user_wait = user_bucket.wait_time(now) if user_bucket else 0.0
+                    global_wait = self.global_bucket.wait_time(now)
+                    # Bulk calls only step aside when global quota is too scarce to serve the waiting interactive ones
+                    higher_waiting = sum(self.waiting[other] for other in higher)
+                    yield_to_higher = higher_waiting and self.global_bucket.tokens < 1 + higher_waiting
+
+                    if not user_wait and not global_wait and not yield_to_higher:
+                        self.global_bucket.take()
+                        if user_bucket:
+                            user_bucket.take()
+                        break
+
+                    if not throttled:
+                        throttled = True
+                        if user_wait or global_wait:
+                            SCHEDULER_THROTTLED.inc(reason="local_user" if user_wait >= global_wait else "local_global")
+                        else:
+                            SCHEDULER_THROTTLED.inc(reason="priority")
+                    self._condition.wait(timeout=max(user_wait, global_wait) or 0.05)
+            finally:
+                self.waiting[priority] -= 1
+                SCHEDULER_QUEUED.dec(priority=priority)
+                self._prune(time.monotonic())
+                self._condition.notify_all()
+        SCHEDULER_WAIT_SECONDS.observe(time.monotonic() - started, priority=priority)
+
+    def block(self, user_id, seconds: float, user_scoped: bool):
+        """Google rejected a call for quota: hold back the user's (or everyone's) calls for `seconds`."""
+        with self._condition:
+            bucket = self._user_bucket(user_id) if user_scoped and user_id is not None else self.global_bucket
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+
+
+scheduler = OutboundScheduler(DRIVE_QUOTA_GLOBAL_QPS, DRIVE_QUOTA_USER_QPS, DRIVE_QUOTA_BURST_SECONDS)
+
+
+def rate_limit_reason(status: int, content) -> str:
+    """The Drive rate-limit reason for a response, or None when it isn't a rate limit."""
+    if status == 429:
+        return "rateLimitExceeded"
+    if status != 403:
+        return None
+    try:
+        errors = json.loads(content).get("error", {}).get("errors", [])
+    except (ValueError, AttributeError, TypeError):
+        return None
+    return next((error.get("reason") for error in errors if error.get("reason") in RATE_LIMIT_REASONS), None)
+
+
+def retry_delay(attempt: int, retry_after: str = None) -> float:
+    """Retry-After when Google sends one, else capped exponential backoff with full jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), DRIVE_RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(DRIVE_RETRY_MAX_DELAY, DRIVE_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def send_scheduled(send, user_id, uri: str, method: str = "GET", body=None):
+    """
+    Send a Drive request through the scheduler: wait for quota, retry rate limits (any method) and 5xx
+    (idempotent methods only) with backoff. `send()` performs the request and returns (status, headers, content).
+    Bodies that are streams can't be replayed, so those requests are never retried.
+    """
+    priority = current_priority(uri)
+    replayable = body is None or isinstance(body, (bytes, str))
+    attempt = 0
+    while True:
+        scheduler.acquire(user_id, priority)
+        status, headers, content = send()
+
+        reason = rate_limit_reason(status, content)
+        if reason:
+            SCHEDULER_THROTTLED.inc(reason=f"upstream_{status}")
+        elif status not in SERVER_ERROR_STATUSES or method.upper() not in IDEMPOTENT_METHODS:
+            return status, headers, content
+
+        if not replayable or attempt + 1 >= DRIVE_RETRY_MAX_ATTEMPTS:
+            return status, headers, content
+
+        delay = retry_delay(attempt, headers.get("retry-after"))
+        if reason:
+            # 403 rateLimitExceeded is the project-wide quota; 429 and userRateLimitExceeded are charged to the user
+            scheduler.block(user_id, delay, user_scoped=not (status == 403 and reason == "rateLimitExceeded"))
+        else:
+            time.sleep(delay)
+        SCHEDULER_RETRIES.inc(status=status)
+        attempt += 1
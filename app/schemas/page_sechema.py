@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, Field
 
 class DrivePaginationRequest(BaseModel):
     """Schema for requesting file list with pagination"""
-    page_token: str = None
-    prev: bool = False
\ No newline at end of file
+    cursor: Optional[str] = Field(None, description="`nextCursor` / `prevCursor` from a previous page")
+    page: Optional[int] = Field(None, ge=1, description="Jump to this page number (relative to `cursor` history when given)")
+    page_token: Optional[str] = Field(None, description="Legacy: raw `nextPageToken`, forward paging only")
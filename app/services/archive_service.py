@@ -0,0 +1,228 @@
+import io
+import zipfile
+import logging
+import tempfile
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from googleapiclient.errors import HttpError
+from app.scheduler import outbound_priority, BULK
+from app.services.drive_service import (
+    get_drive_service, drive_api_error, iter_media_range, iter_media_download, EXPORT_FORMATS
+)
+from app.services.export_cache import export_cache_path, get_cached_export, cache_export_stream
+from app.metrics import Counter
+from app.config import (
+    DRIVE_ARCHIVE_CONCURRENCY, DRIVE_ARCHIVE_PREFETCH_FILES, DRIVE_ARCHIVE_SPOOL_MEMORY, DRIVE_ARCHIVE_MAX_FILES,
+    EXPORT_CACHE_ENABLED
+)
+
+logger = logging.getLogger(__name__)
+
+# 🔹 /drive/download-archive: many files as one ZIP, built while it is sent.
+# Files are fetched (or exported) in parallel into spooled temp files, at most DRIVE_ARCHIVE_PREFETCH_FILES
+# ahead of the entry being written, and added to the archive in request order. Entries are stored uncompressed
+# (Drive content is mostly already compressed), so the archive costs no CPU and memory stays flat.
+
+ARCHIVE_FILES = Counter("drive_archive_files_total", "Files added to ZIP archives by outcome", labels=("result",))
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+ARCHIVE_FILE_FIELDS = "id, name, mimeType, size, modifiedTime, version"
+COPY_CHUNK_SIZE = 256 * 1024
+ERRORS_ENTRY = "_errors.txt"
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable stream zipfile writes into; the response generator drains it after every write."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _list_folder(drive_service, folder_id: str, path: str = ""):
+    """Every file under a folder (recursively), as Drive metadata with an added archive `path`."""
+    files, folders = [], deque([(folder_id, path)])
+    while folders:
+        parent_id, parent_path = folders.popleft()
+        page_token = None
+        while True:
+            response = drive_service.files().list(
+                q=f"'{parent_id}' in parents and trashed = false",
+                pageSize=1000,
+                fields=f"nextPageToken, files({ARCHIVE_FILE_FIELDS})",
+                pageToken=page_token,
+            ).execute()
+            for file in response.get("files", []):
+                file_path = f"{parent_path}{file['name']}"
+                if file["mimeType"] == FOLDER_MIME_TYPE:
+                    folders.append((file["id"], file_path + "/"))
+                else:
+                    files.append({**file, "path": file_path})
+                if len(files) > DRIVE_ARCHIVE_MAX_FILES:
+                    raise HTTPException(status_code=400, detail=f"Archives are limited to {DRIVE_ARCHIVE_MAX_FILES} files")
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+    return files
+
+
+def _fetch_file(drive_service, file: dict):
+    """Download or export one file into a spooled temp file; returns (metadata, spool, archive name)."""
+    with outbound_priority(BULK):
+        if "mimeType" not in file:
+            file = {**drive_service.files().get(fileId=file["id"], fields=ARCHIVE_FILE_FIELDS).execute(), **file}
+        name = file.get("path") or file["name"]
+        mime_type = file["mimeType"]
+
+        if mime_type == FOLDER_MIME_TYPE:
+            raise ValueError("is a folder; pass it as folder_id")
+        export_mime, file_extension = EXPORT_FORMATS.get(mime_type, (None, ""))
+        if export_mime:
+            chunks = iter_media_download(drive_service.files().export_media(fileId=file["id"], mimeType=export_mime))
+            if EXPORT_CACHE_ENABLED and file.get("version") and file.get("modifiedTime"):
+                cache_path = export_cache_path(file["id"], export_mime, file["version"], file["modifiedTime"])
+                if get_cached_export(cache_path):
+                    return file, open(cache_path, "rb"), name + file_extension
+                chunks = cache_export_stream(cache_path, chunks)
+        elif mime_type.startswith("application/vnd.google-apps."):
+            raise ValueError("cannot be downloaded or exported")
+        elif "size" in file:
+            chunks = iter_media_range(drive_service.files().get_media(fileId=file["id"]), 0, int(file["size"]) - 1)
+        else:
+            chunks = iter_media_download(drive_service.files().get_media(fileId=file["id"]))
+
+        spool = tempfile.SpooledTemporaryFile(max_size=DRIVE_ARCHIVE_SPOOL_MEMORY)
+        try:
+            for chunk in chunks:
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return file, spool, name + file_extension
+
+
+def _unique_name(name: str, used: set) -> str:
+    """'report.pdf', 'report (2).pdf', ... so two Drive files with one name don't collide in the archive."""
+    candidate, stem, dot, extension = name, *name.rpartition(".")
+    if not stem:
+        stem, dot, extension = name, "", ""
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem} ({counter}){dot}{extension}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def _zip_info(name: str, file: dict, size: int) -> zipfile.ZipInfo:
+    modified = datetime.utcnow()
+    if file.get("modifiedTime"):
+        modified = datetime.fromisoformat(file["modifiedTime"].replace("Z", "+00:00"))
+    info = zipfile.ZipInfo(name, date_time=max(modified.timetuple()[:6], (1980, 1, 1, 0, 0, 0)))
+    info.file_size = size  # Lets zipfile pick ZIP64 only for entries that need it
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+def download_archive(db: Session, user_id: str, file_ids: list = None, folder_id: str = None):
+    """
+    Stream a ZIP of the given files, or of everything under a folder.
+    Files that fail are left out and listed in an `_errors.txt` entry (the response is already under way).
+    """
+    if bool(file_ids) == bool(folder_id):
+        raise HTTPException(status_code=400, detail="Pass either file_ids or folder_id")
+    if file_ids and len(file_ids) > DRIVE_ARCHIVE_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Archives are limited to {DRIVE_ARCHIVE_MAX_FILES} files")
+
+    drive_service = get_drive_service(db, user_id)
+    archive_name = "drive-files.zip"
+    if folder_id:
+        # ✅ List up front so a bad folder id or auth problem is still a proper HTTP error
+        try:
+            folder = drive_service.files().get(fileId=folder_id, fields="id, name, mimeType").execute()
+            if folder["mimeType"] != FOLDER_MIME_TYPE:
+                raise HTTPException(status_code=400, detail="folder_id is not a folder")
+            files = _list_folder(drive_service, folder_id)
+        except HttpError as error:
+            raise drive_api_error(error)
+        archive_name = folder["name"].replace(" ", "_").replace('"', "") + ".zip"
+    else:
+        files = [{"id": file_id} for file_id in dict.fromkeys(file_ids)]
+
+    def archive():
+        executor = ThreadPoolExecutor(max_workers=DRIVE_ARCHIVE_CONCURRENCY, thread_name_prefix="archive-fetch")
+        pending = deque()
+        upcoming = iter(files)
+        sink = _ZipSink()
+        errors = []
+        used_names = set()
+
+        def fill_window():
+            for file in upcoming:
+                pending.append((file, executor.submit(_fetch_file, drive_service, file)))
+                if len(pending) >= DRIVE_ARCHIVE_PREFETCH_FILES:
+                    break
+
+        try:
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zip_file:
+                fill_window()
+                while pending:
+                    file, future = pending.popleft()
+                    fill_window()
+                    try:
+                        metadata, spool, name = future.result()
+                    except Exception as e:
+                        ARCHIVE_FILES.inc(result="failed")
+                        errors.append(f"{file.get('path') or file['id']}: {e}")
+                        continue
+
+                    with spool:
+                        spool.seek(0, 2)
+                        size = spool.tell()
+                        spool.seek(0)
+                        with zip_file.open(_zip_info(_unique_name(name, used_names), metadata, size), "w") as entry:
+                            while True:
+                                chunk = spool.read(COPY_CHUNK_SIZE)
+                                if not chunk:
+                                    break
+                                entry.write(chunk)
+                                data = sink.drain()
+                                if data:
+                                    yield data
+                    ARCHIVE_FILES.inc(result="added")
+
+                if errors:
+                    zip_file.writestr(_zip_info(ERRORS_ENTRY, {}, 0), "\n".join(errors) + "\n")
+            yield sink.drain()
+        finally:
+            # Client gone or done: stop fetching and release whatever was already spooled
+            executor.shutdown(wait=False, cancel_futures=True)
+            for _, future in pending:
+                future.add_done_callback(_close_spool)
+
+    return StreamingResponse(
+        archive(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{archive_name}"'},
+    )
+
+
+def _close_spool(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result()[1].close()
@@ -4,17 +4,21 @@ import json
 import logging
 from google_auth_oauthlib.flow import Flow
 from sqlalchemy.orm import Session
-import requests
 from fastapi import HTTPException
-from app.repositories.user_repo import save_user_token,get_user_google_token,refresh_access_token,remove_invalid_token
-from app.repositories.state_repo import save_state, get_user_id_by_state, delete_state
-from app.config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, SCOPES
+from datetime import datetime
+from app.cache import MISSING
+from app.repositories.user_repo import save_user_token,get_user_google_token,get_user_token,remove_invalid_token,token_validation_cache
+from app.services.token_refresh_service import refresh_user_token
+from app.repositories.state_repo import save_state, pop_user_id_by_state
+from app.http_client import http_session, use_shared_pool, scheduled_request
+from app.concurrency import run_blocking
+from app.config import (
+    CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, SCOPES, AUTH_STATUS_CACHE_TTL, GOOGLE_API_ROOT_URL, GOOGLE_TOKEN_URI, GOOGLE_REVOKE_URI
+)
 
 logger = logging.getLogger(__name__)
 
-GOOGLE_DRIVE_API_TEST_URL = "https://www.googleapis.com/drive/v3/about?fields=user"
-
-def generate_auth_url(user_id: str, callback_url: str) -> str:
+async def generate_auth_url(user_id: str, callback_url: str) -> str:
     """
     Generates an OAuth URL with a secure state token that includes the callback URL.
     """
@@ -27,7 +31,7 @@ def generate_auth_url(user_id: str, callback_url: str) -> str:
         encoded_state = base64.urlsafe_b64encode(json.dumps(state_data).encode()).decode()
 
         # Store the raw `state` and its `encoded_state`
-        save_state(state, encoded_state)  # Save both state and encoded state
+        await save_state(state, encoded_state)  # Save both state and encoded state
 
         # Create Google OAuth Flow
         flow = Flow.from_client_config(
@@ -37,7 +41,7 @@ def generate_auth_url(user_id: str, callback_url: str) -> str:
                     "client_secret": CLIENT_SECRET,
                     "redirect_uris": [REDIRECT_URI],
                     "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token"
+                    "token_uri": GOOGLE_TOKEN_URI
                 }
             },
             scopes=SCOPES,
@@ -55,12 +59,12 @@ def generate_auth_url(user_id: str, callback_url: str) -> str:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate authentication URL: {str(e)}")
 
-def handle_oauth_callback(code: str, state: str, db: Session):
+async def handle_oauth_callback(code: str, state: str, db: Session):
     """
     Handles OAuth callback, validates the state, retrieves user info, and stores the access token.
     """
-    # Retrieve the encoded state from storage
-    encoded_state = get_user_id_by_state(state)
+    # Consume the encoded state atomically (GETDEL): a state can only be redeemed once
+    encoded_state = await pop_user_id_by_state(state)
     if not encoded_state:
         logger.warning(f"Invalid or expired OAuth state: {state}")
         raise HTTPException(status_code=400, detail="Invalid or expired authentication state.")
@@ -74,57 +78,74 @@ def handle_oauth_callback(code: str, state: str, db: Session):
         if not user_id:
             raise HTTPException(status_code=400, detail="Invalid state: Missing user_id")
 
-        # Create OAuth Flow
-        flow = Flow.from_client_config(
-            {
-                "web": {
-                    "client_id": CLIENT_ID,
-                    "client_secret": CLIENT_SECRET,
-                    "redirect_uris": [REDIRECT_URI],
-                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                    "token_uri": "https://oauth2.googleapis.com/token"
-                }
-            },
-            scopes=SCOPES,
-        )
-        flow.redirect_uri = REDIRECT_URI
-
-        # Exchange the authorization code for access token
-        flow.fetch_token(code=code)
-        credentials = flow.credentials
-
-        # Store the user's access and refresh token
-        save_user_token(db, user_id, credentials.token, credentials.refresh_token)
-
-        # Remove the used state from storage
-        delete_state(state)
+        token = await run_blocking(_exchange_code, code, user_id, db)
 
         # Return the OAuth access token
-        return credentials.token,callback_url
+        return token,callback_url
 
     except Exception as e:
         logger.error(f"Error handling OAuth callback: {e}")
         raise HTTPException(status_code=500, detail="Failed to authenticate user.")
 
-GOOGLE_DRIVE_API_TEST_URL = "https://www.googleapis.com/drive/v3/about?fields=user"
-
-def validate_google_token(db: Session, user_id: str, token: str):
+def _exchange_code(code: str, user_id: str, db: Session):
+    """Exchange the authorization code with Google and store the user's tokens (blocking)."""
+    # Create OAuth Flow
+    flow = Flow.from_client_config(
+        {
+            "web": {
+                "client_id": CLIENT_ID,
+                "client_secret": CLIENT_SECRET,
+                "redirect_uris": [REDIRECT_URI],
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                "token_uri": GOOGLE_TOKEN_URI
+            }
+        },
+        scopes=SCOPES,
+    )
+    flow.redirect_uri = REDIRECT_URI
+    use_shared_pool(flow.oauth2session)
+
+    # Exchange the authorization code for access token
+    flow.fetch_token(code=code)
+    credentials = flow.credentials
+
+    # Store the user's access and refresh token
+    save_user_token(db, user_id, credentials.token, credentials.refresh_token, credentials.expiry)
+    return credentials.token
+
+GOOGLE_DRIVE_API_TEST_URL = f"{GOOGLE_API_ROOT_URL}drive/v3/about?fields=user"
+
+def _validation_ttl(expires_at: datetime = None) -> int:
+    """Cache a successful validation for AUTH_STATUS_CACHE_TTL, but never past the token's known expiry."""
+    if not expires_at:
+        return AUTH_STATUS_CACHE_TTL
+    return min(AUTH_STATUS_CACHE_TTL, int((expires_at - datetime.utcnow()).total_seconds()))
+
+def validate_google_token(db: Session, user_id: str, token: str, expires_at: datetime = None):
     """
     Tests the provided Google OAuth token by making a request to Google Drive API.
+    Successful results are cached per user until the token's expiry (or AUTH_STATUS_CACHE_TTL).
     If the token is expired, attempt to refresh it.
     """
+    # ✅ This exact token was validated recently (a different cached token counts as a miss)
+    if token_validation_cache.get(user_id, expected=token) is not MISSING:
+        return token
+
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(GOOGLE_DRIVE_API_TEST_URL, headers=headers)
+    response = scheduled_request(http_session, "GET", GOOGLE_DRIVE_API_TEST_URL, user_id, headers=headers)
     if response.status_code == 200:
+        token_validation_cache.set(user_id, token, ttl=_validation_ttl(expires_at))
         return token  # ✅ Token is valid
 
     elif response.status_code in [401, 403]:  # ❌ Unauthorized or Forbidden (Expired Token)
         try:
             # 🔄 Attempt to refresh the token
-            new_token = refresh_access_token(db, user_id)
-            return new_token  # ✅ Return new valid token
-        except HTTPException:
-            remove_invalid_token(db, user_id)  # ❌ Refresh failed, remove token
+            new_token = refresh_user_token(db, user_id)
+            token_validation_cache.set(user_id, new_token.access_token, ttl=_validation_ttl(new_token.expires_at))
+            return new_token.access_token  # ✅ Return new valid token
+        except HTTPException as e:
+            if e.status_code == 401:
+                remove_invalid_token(db, user_id)  # ❌ Refresh token rejected, remove token
             return None
 
     else:
@@ -135,13 +156,13 @@ def check_google_auth_status_service(db: Session, user_id: str):
     Checks if the user has a valid Google OAuth token.
     If expired, it attempts to refresh it.
     """
-    token = get_user_google_token(db, user_id)
-    print(token,user_id)
+    user_token = get_user_token(db, user_id)
+    logger.debug(f"Checking Google auth status for user {user_id}")
 
-    if not token:
+    if not user_token:
         return False  # No token found
 
-    valid_token = validate_google_token(db, user_id, token)
+    valid_token = validate_google_token(db, user_id, user_token.access_token, user_token.expires_at)
 
     return valid_token is not None
 
@@ -150,12 +171,12 @@ def get_google_auth_token_service(db: Session, user_id: str):
     Retrieves the stored Google OAuth token if it is valid. 
     If expired, it tries to refresh it first.
     """
-    token = get_user_google_token(db, user_id)
+    user_token = get_user_token(db, user_id)
 
-    if not token:
+    if not user_token:
         return None
 
-    return validate_google_token(db, user_id, token)
+    return validate_google_token(db, user_id, user_token.access_token, user_token.expires_at)
 
 def disconnect_google_account(db: Session, user_id: str):
     """
@@ -167,8 +188,8 @@ def disconnect_google_account(db: Session, user_id: str):
         raise HTTPException(status_code=400, detail="No Google account linked.")
 
     # Revoke token using Google API
-    revoke_url = f"https://accounts.google.com/o/oauth2/revoke?token={token}"
-    response = requests.post(revoke_url, headers={"Content-Type": "application/x-www-form-urlencoded"})
+    revoke_url = f"{GOOGLE_REVOKE_URI}?token={token}"
+    response = http_session.post(revoke_url, headers={"Content-Type": "application/x-www-form-urlencoded"})
     print(response)
     if response.status_code not in [200, 400]:
         raise HTTPException(status_code=500, detail="Failed to revoke Google account access.")
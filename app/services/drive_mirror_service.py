@@ -0,0 +1,174 @@
+import base64
+import logging
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from googleapiclient.errors import HttpError
+from app.models.drive_file import DriveFile, DriveSyncState
+from app.redis_client import redis_client
+from app.services.drive_service import get_drive_service, drive_api_error, parse_drive_time
+from app.config import DRIVE_MIRROR_MAX_STALENESS
+
+logger = logging.getLogger(__name__)
+
+MIRROR_FIELDS = "id, name, mimeType, webViewLink, modifiedTime, parents, md5Checksum"
+MIRROR_PAGE_SIZE = 1000  # Maximum page size for files.list and changes.list
+LIST_PAGE_SIZE = 10  # Same page size as the live /drive/files listing
+
+
+def _file_row(user_id: str, file: dict):
+    return {
+        "user_id": str(user_id),
+        "file_id": file["id"],
+        "name": file.get("name", ""),
+        "mime_type": file.get("mimeType"),
+        "web_view_link": file.get("webViewLink"),
+        "modified_time": parse_drive_time(file.get("modifiedTime")),
+        "parents": file.get("parents"),
+        "md5_checksum": file.get("md5Checksum"),
+    }
+
+
+def crawl_user_drive(db: Session, user_id: str):
+    """
+    Build a user's mirror from scratch.
+    The Changes start token is taken before the crawl, so edits made while crawling are replayed by the next sync.
+    """
+    drive_service = get_drive_service(db, user_id)
+    start_page_token = drive_service.changes().getStartPageToken().execute()["startPageToken"]
+
+    db.query(DriveFile).filter(DriveFile.user_id == str(user_id)).delete()
+    page_token = None
+    while True:
+        response = drive_service.files().list(
+            pageSize=MIRROR_PAGE_SIZE,
+            fields=f"nextPageToken, files({MIRROR_FIELDS})",
+            pageToken=page_token,
+        ).execute()
+        db.bulk_insert_mappings(DriveFile, [_file_row(user_id, f) for f in response.get("files", [])])
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    db.merge(DriveSyncState(user_id=str(user_id), start_page_token=start_page_token, last_synced_at=datetime.utcnow()))
+    db.commit()
+
+
+def sync_user_changes(db: Session, user_id: str, sync_state: DriveSyncState):
+    """Apply every change since the stored start page token, then store the new one."""
+    drive_service = get_drive_service(db, user_id)
+    page_token = sync_state.start_page_token
+
+    while page_token:
+        try:
+            response = drive_service.changes().list(
+                pageToken=page_token,
+                pageSize=MIRROR_PAGE_SIZE,
+                fields=f"nextPageToken, newStartPageToken, changes(changeType, fileId, removed, file({MIRROR_FIELDS}))",
+            ).execute()
+        except HttpError as error:
+            if error.resp.status in (404, 410):
+                logger.warning(f"Changes token expired for user {user_id}, recrawling drive mirror")
+                return crawl_user_drive(db, user_id)
+            raise
+
+        for change in response.get("changes", []):
+            if change.get("changeType", "file") != "file" or not change.get("fileId"):
+                continue  # Shared drive changes carry a driveId, not a file
+            if change.get("removed") or "file" not in change:
+                db.query(DriveFile).filter(
+                    DriveFile.user_id == str(user_id), DriveFile.file_id == change["fileId"]
+                ).delete()
+            else:
+                db.merge(DriveFile(**_file_row(user_id, change["file"])))
+
+        if "newStartPageToken" in response:
+            sync_state.start_page_token = response["newStartPageToken"]
+        page_token = response.get("nextPageToken")
+
+    sync_state.last_synced_at = datetime.utcnow()
+    db.commit()
+
+
+def refresh_mirror(db: Session, user_id: str, max_staleness: int):
+    """Crawl or incrementally sync a user's mirror if it is older than `max_staleness` seconds."""
+    sync_state = db.query(DriveSyncState).filter(DriveSyncState.user_id == str(user_id)).first()
+    if sync_state and sync_state.last_synced_at >= datetime.utcnow() - timedelta(seconds=max_staleness):
+        return
+
+    # Only one worker syncs a user at a time; others serve the index as it is
+    lock = redis_client.lock(f"drive_mirror_lock:{user_id}", timeout=300)
+    try:
+        acquired = lock.acquire(blocking=not sync_state, blocking_timeout=300)
+    except Exception as e:
+        logger.error(f"Error acquiring drive mirror lock, syncing without it: {e}")
+        acquired, lock = True, None
+    if not acquired:
+        return
+
+    try:
+        db.expire_all()
+        sync_state = db.query(DriveSyncState).filter(DriveSyncState.user_id == str(user_id)).first()
+        if not sync_state:
+            crawl_user_drive(db, user_id)
+        elif sync_state.last_synced_at < datetime.utcnow() - timedelta(seconds=max_staleness):
+            sync_user_changes(db, user_id, sync_state)
+    finally:
+        if lock:
+            try:
+                lock.release()
+            except Exception as e:
+                logger.warning(f"Error releasing drive mirror lock: {e}")
+
+
+def _encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"mirror:{offset}".encode()).decode()
+
+
+def _decode_offset(page_token: str) -> int:
+    try:
+        prefix, _, offset = base64.urlsafe_b64decode(page_token.encode()).decode().partition(":")
+        if prefix != "mirror":
+            raise ValueError(page_token)
+        return int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page token")
+
+
+def list_mirrored_files(db: Session, user_id: str, page_token: str = None, max_staleness: int = None, page: int = None):
+    """
+    Serve /drive/files from the local metadata index.
+    The index is synced first when older than `max_staleness` seconds (DRIVE_MIRROR_MAX_STALENESS by default).
+    Page tokens are plain offsets, so they double as the next/previous cursors and `page` jumps directly.
+    """
+    try:
+        refresh_mirror(db, user_id, DRIVE_MIRROR_MAX_STALENESS if max_staleness is None else max_staleness)
+    except HttpError as error:
+        raise drive_api_error(error)
+
+    if page:
+        offset = (page - 1) * LIST_PAGE_SIZE
+    else:
+        offset = _decode_offset(page_token) if page_token else 0
+    rows = (
+        db.query(DriveFile)
+        .filter(DriveFile.user_id == str(user_id))
+        .order_by(DriveFile.modified_time.desc(), DriveFile.file_id)
+        .offset(offset)
+        .limit(LIST_PAGE_SIZE + 1)
+        .all()
+    )
+
+    next_page_token = _encode_offset(offset + LIST_PAGE_SIZE) if len(rows) > LIST_PAGE_SIZE else None
+    prev_page_token = _encode_offset(max(offset - LIST_PAGE_SIZE, 0)) if offset else None
+    return {
+        "files": [
+            {"id": row.file_id, "name": row.name, "mimeType": row.mime_type, "webViewLink": row.web_view_link}
+            for row in rows[:LIST_PAGE_SIZE]
+        ],
+        "nextPageToken": next_page_token,
+        "page": offset // LIST_PAGE_SIZE + 1,
+        "nextCursor": next_page_token,
+        "prevCursor": prev_page_token,
+        "hasPreviousPage": prev_page_token is not None,
+    }
@@ -1,16 +1,40 @@
 import io
+import re
+import json
+import hashlib
+import queue
+import logging
+import itertools
+import threading
 import requests
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
 from fastapi import HTTPException,UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from googleapiclient.errors import HttpError
-from google.auth.transport.requests import Request
-from app.repositories.user_repo import get_user_token, save_user_token
-from app.config import CENTRAL_DRIVE_FOLDER_ID, CLIENT_ID, CLIENT_SECRET
+from app.repositories.user_repo import get_user_token
+from app.services.token_refresh_service import refresh_user_token, credentials_refresh_handler
+from app.services.drive_client_cache import build_drive_client, get_cached_drive_client, cache_drive_client
+from app.services.export_cache import export_cache_path, get_cached_export, cache_export_stream
+from app.services.list_cursor import encode_cursor, decode_cursor
+from app.http_client import timed_media
+from app.config import (
+    CENTRAL_DRIVE_FOLDER_ID, CLIENT_ID, CLIENT_SECRET, DRIVE_UPLOAD_CHUNK_SIZE, DRIVE_DOWNLOAD_CHUNK_SIZE,
+    DRIVE_BATCH_UPLOAD_CONCURRENCY, DRIVE_PERMISSION_BATCH_SIZE, GOOGLE_TOKEN_URI,
+    DRIVE_LIST_STREAM_PAGE_SIZE, DRIVE_LIST_PREFETCH_PAGES, DRIVE_PAGE_PREFETCH_ENABLED, DRIVE_PAGE_PREFETCH_DEPTH,
+    DRIVE_PAGE_PREFETCH_CONCURRENCY, DRIVE_PAGE_PREFETCH_TTL, DRIVE_PAGE_PREFETCH_CACHE_SIZE, EXPORT_CACHE_ENABLED,
+    DRIVE_RETRY_BASE_DELAY, DRIVE_COALESCE_ENABLED, DRIVE_LIST_MAX_PAGE_JUMP
+)
+from app.cache import TwoTierCache, MISSING
+from app.scheduler import outbound_priority, rate_limit_reason, BULK
+from app.singleflight import SingleFlight, SharedStreams
+from app.metrics import Counter, UPLOAD_BYTES_IN_FLIGHT, UPLOAD_BYTES_TOTAL, DOWNLOAD_BYTES_TOTAL
+
+logger = logging.getLogger(__name__)
 
 MIME_TYPES = {
     "doc": "application/vnd.google-apps.document",
@@ -36,149 +60,396 @@ CONVERSION_MAP = {
 }
 
 
-user_page_tokens = {}
 
-
-def get_drive_service(db: Session, user_id: str):
-    """Authenticate the user and return Google Drive API service with auto-refresh support."""
-    
+def get_drive_credentials(db: Session, user_id: str):
+    """Return the user's Google OAuth credentials, refreshing the access token first if it is about to expire."""
     user_token = get_user_token(db, user_id)
     if not user_token:
         raise HTTPException(status_code=401, detail="User not authenticated")
 
-    # ✅ Create full credentials with refresh support
+    # 🔹 Tokens are refreshed ahead of expiry in the background; refresh inline only if that hasn't happened
+    if user_token.has_refresh_token and user_token.expires_at and user_token.expires_at <= datetime.utcnow() + timedelta(seconds=60):
+        user_token = refresh_user_token(db, user_id)
+
+    # ✅ Create full credentials with refresh support (through our refresh path, which holds the refresh token)
     credentials = Credentials(
         token=user_token.access_token,
-        refresh_token=user_token.refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
+        token_uri=GOOGLE_TOKEN_URI,
         client_id=CLIENT_ID,
-        client_secret=CLIENT_SECRET
+        client_secret=CLIENT_SECRET,
+        expiry=user_token.expires_at,
+        refresh_handler=credentials_refresh_handler(user_id) if user_token.has_refresh_token else None,
     )
-    # 🔹 If token is expired, refresh it automatically
-    if credentials.expired and credentials.refresh_token:
-        try:
-            credentials.refresh(Request())  # Automatically refresh the token
-            save_user_token(db, user_id, credentials.token, credentials.refresh_token)
-        except Exception as e:
-            raise HTTPException(status_code=401, detail="Failed to refresh access token. Please log in again.")
-
-    return build("drive", "v3", credentials=credentials)
+    return credentials
 
-def list_drive_files(db: Session, user_id: str, page_token: str = None):
-    """List files from Google Drive, ensuring token is valid."""
-    drive_service = get_drive_service(db, user_id)
-    
-    response = drive_service.files().list(
+def get_drive_service(db: Session, user_id: str):
+    """Authenticate the user and return Google Drive API service with auto-refresh support."""
+    credentials = get_drive_credentials(db, user_id)
+
+    # ✅ Reuse the user's authorized client while their token is unchanged
+    drive_service = get_cached_drive_client(user_id, credentials.token)
+    if drive_service:
+        return drive_service
+
+    drive_service = build_drive_client(credentials, str(user_id))
+    cache_drive_client(user_id, credentials.token, drive_service)
+    return drive_service
+
+def drive_api_error(error: HttpError):
+    """Map a Drive API error to our response: rate limits become 429 with Retry-After, everything else 500."""
+    if rate_limit_reason(error.resp.status, error.content):
+        retry_after = error.resp.get("retry-after") or str(DRIVE_RETRY_BASE_DELAY * 2)
+        return HTTPException(status_code=429, detail="Google Drive rate limit exceeded, retry later", headers={"Retry-After": retry_after})
+    return HTTPException(status_code=500, detail=f"Google Drive API error: {error}")
+
+def parse_drive_time(value: str):
+    """Parse Drive's RFC 3339 timestamps ('2024-05-01T10:00:00.000Z') into naive UTC datetimes."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+# 🔹 Speculative prefetch: "{user_id}:{page_token}" -> listing page, kept for DRIVE_PAGE_PREFETCH_TTL
+prefetched_pages = TwoTierCache("drive_list_page", DRIVE_PAGE_PREFETCH_CACHE_SIZE, DRIVE_PAGE_PREFETCH_TTL, DRIVE_PAGE_PREFETCH_TTL)
+PAGE_PREFETCH_LOOKUPS = Counter("drive_page_prefetch_lookups_total", "Next-page requests served from a prefetch (hit) or from Google (miss)", labels=("result",))
+PAGE_PREFETCHES = Counter("drive_page_prefetches_total", "Background page prefetches by outcome", labels=("result",))
+_prefetch_executor = ThreadPoolExecutor(max_workers=DRIVE_PAGE_PREFETCH_CONCURRENCY, thread_name_prefix="page-prefetch")
+_prefetch_slots = threading.BoundedSemaphore(DRIVE_PAGE_PREFETCH_CONCURRENCY)
+_prefetching = set()
+_prefetching_lock = threading.Lock()
+
+# 🔹 Identical concurrent calls share one upstream request (keys always include the user)
+_listing_calls = SingleFlight("drive_files_list")
+_metadata_calls = SingleFlight("drive_files_get")
+_shared_downloads = SharedStreams("drive_download")
+
+def coalesce(calls: SingleFlight, key, fn):
+    return calls.do(key, fn) if DRIVE_COALESCE_ENABLED else fn()
+
+def _fetch_listing_page(drive_service, user_id: str, page_token: str = None):
+    response = coalesce(_listing_calls, (str(user_id), page_token), drive_service.files().list(
         pageSize=10,
         fields="nextPageToken, files(id, name, mimeType, webViewLink)",
         pageToken=page_token
-    ).execute()
+    ).execute)
 
     return {
         "files": response.get("files", []),
         "nextPageToken": response.get("nextPageToken")
     }
 
-# def list_drive_files(db: Session, user_id: str, page_token: str = None, prev: bool = False):
-#     """
-#     List files from Google Drive, supporting pagination.
-    
-#     - If `prev=True`, retrieves the last stored page token for previous navigation.
-#     - Stores history of page tokens for navigation.
-#     """
+def _prefetch_pages(drive_service, user_id: str, page_token: str):
+    """Fetch up to DRIVE_PAGE_PREFETCH_DEPTH pages starting at `page_token` into the prefetch cache."""
+    try:
+        with outbound_priority(BULK):  # Speculative work never delays a user's own requests
+            for _ in range(DRIVE_PAGE_PREFETCH_DEPTH):
+                key = f"{user_id}:{page_token}"
+                page = prefetched_pages.get_local(key)
+                if page is MISSING:
+                    page = _fetch_listing_page(drive_service, user_id, page_token)
+                    prefetched_pages.set(key, page)
+                    PAGE_PREFETCHES.inc(result="stored")
+                page_token = page["nextPageToken"]
+                if not page_token:
+                    break
+    except Exception as e:
+        PAGE_PREFETCHES.inc(result="failed")
+        logger.warning(f"Page prefetch failed for user {user_id}: {e}")
+    finally:
+        with _prefetching_lock:
+            _prefetching.discard(user_id)
+        _prefetch_slots.release()
+
+def _schedule_prefetch(drive_service, user_id: str, page_token: str):
+    """Start a background prefetch unless one is already running for the user or all slots are busy."""
+    with _prefetching_lock:
+        if user_id in _prefetching:
+            return
+        if not _prefetch_slots.acquire(blocking=False):
+            PAGE_PREFETCHES.inc(result="skipped")
+            return
+        _prefetching.add(user_id)
+    _prefetch_executor.submit(_prefetch_pages, drive_service, user_id, page_token)
+
+def _listing_page(drive_service, user_id: str, page_token: str = None):
+    """One page of the listing, from the prefetch cache when it is there."""
+    page = MISSING
+    if DRIVE_PAGE_PREFETCH_ENABLED and page_token:
+        page = prefetched_pages.get(f"{user_id}:{page_token}")
+        PAGE_PREFETCH_LOOKUPS.inc(result="miss" if page is MISSING else "hit")
+    if page is MISSING:
+        page = _fetch_listing_page(drive_service, user_id, page_token)
+
+    # ✅ The client almost always asks for the next page next; have it ready
+    if DRIVE_PAGE_PREFETCH_ENABLED and page["nextPageToken"]:
+        _schedule_prefetch(drive_service, str(user_id), page["nextPageToken"])
+
+    return page
+
+def _seek_page(drive_service, user_id: str, page: int, tokens: list, target: int, max_jump: int = DRIVE_LIST_MAX_PAGE_JUMP):
+    """
+    Move a cursor (page number + Drive tokens up to it) to page `target`.
+    Pages the cursor remembers are free; later ones (or earlier ones it has forgotten) are walked to
+    with token-only list calls, at most `max_jump` of them (None: no limit).
+    """
+    first = page - len(tokens) + 1
+    if first <= target <= page:
+        return target, tokens[:target - first + 1]
+    if target < first:
+        page, tokens = 1, [None]  # Older than the cursor's history: walk again from the start
+
+    if max_jump is not None and target - page > max_jump:
+        raise HTTPException(status_code=400, detail=f"Can jump at most {max_jump} pages ahead of the cursor")
+    while page < target:
+        next_page_token = drive_service.files().list(
+            pageSize=10, fields="nextPageToken", pageToken=tokens[-1]
+        ).execute().get("nextPageToken")
+        if not next_page_token:
+            raise HTTPException(status_code=404, detail=f"Page {target} does not exist (the listing has {page} pages)")
+        page, tokens = page + 1, tokens + [next_page_token]
+    return page, tokens
+
+def list_drive_files(db: Session, user_id: str, page_token: str = None, cursor: str = None, page: int = None):
+    """
+    List files from Google Drive, ensuring token is valid.
+    Navigate with the returned `nextCursor` / `prevCursor`, or pass `page` (with or without a cursor) to jump.
+    A raw Drive `page_token` is still accepted for forward-only paging.
+    """
+    drive_service = get_drive_service(db, user_id)
+    if page_token and not cursor:
+        return _listing_page(drive_service, user_id, page_token)
+
+    number, tokens, seek = decode_cursor(cursor, user_id) if cursor else (1, [None], None)
+    if page:
+        number, tokens = _seek_page(drive_service, user_id, number, tokens, page)
+    elif seek:
+        # ✅ A previous-page cursor issued past the end of the history: replay from the start (our own cursor, no cap)
+        number, tokens = _seek_page(drive_service, user_id, number, tokens, seek, max_jump=None)
+
+    listing = _listing_page(drive_service, user_id, tokens[-1])
+    next_cursor = encode_cursor(user_id, number + 1, tokens + [listing["nextPageToken"]]) if listing["nextPageToken"] else None
+    prev_cursor = None
+    if len(tokens) > 1:
+        prev_cursor = encode_cursor(user_id, number - 1, tokens[:-1])
+    elif number > 1:
+        prev_cursor = encode_cursor(user_id, 1, [None], seek=number - 1)
+    return {
+        **listing,
+        "page": number,
+        "nextCursor": next_cursor,
+        "prevCursor": prev_cursor,
+        "hasPreviousPage": prev_cursor is not None,
+    }
 
-#     drive_service = get_drive_service(db, user_id)
+DEFAULT_FILE_FIELDS = "id, name, mimeType, webViewLink"
+FILE_FIELDS_PATTERN = re.compile(r"^[A-Za-z0-9_]+(\([A-Za-z0-9_, ()]+\))?(\s*,\s*[A-Za-z0-9_]+(\([A-Za-z0-9_, ()]+\))?)*$")
+
+def _file_fields(fields: str = None) -> str:
+    """Validate a client-chosen file field list, e.g. 'id,name,owners(emailAddress)'."""
+    if not fields:
+        return DEFAULT_FILE_FIELDS
+    fields = fields.strip()
+    if not FILE_FIELDS_PATTERN.match(fields):
+        raise HTTPException(status_code=400, detail="Invalid fields: use a comma-separated list of Drive file fields")
+    return fields
+
+def stream_drive_files(db: Session, user_id: str, fields: str = None):
+    """
+    Stream every file in the user's drive as NDJSON, one file per line.
+    Pages of DRIVE_LIST_STREAM_PAGE_SIZE are fetched by a producer thread up to DRIVE_LIST_PREFETCH_PAGES
+    ahead of the client, and only the requested fields are asked of Google.
+    """
+    drive_service = get_drive_service(db, user_id)
+    list_fields = f"nextPageToken, files({_file_fields(fields)})"
+
+    def fetch_page(page_token=None):
+        return drive_service.files().list(
+            pageSize=DRIVE_LIST_STREAM_PAGE_SIZE, fields=list_fields, pageToken=page_token
+        ).execute()
+
+    # ✅ Fetch the first page up front so auth and API errors still get a proper status code
+    try:
+        first_page = fetch_page()
+    except HttpError as error:
+        raise drive_api_error(error)
+
+    pages = queue.Queue(maxsize=DRIVE_LIST_PREFETCH_PAGES)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        page = first_page
+        try:
+            while put(page) and page.get("nextPageToken"):
+                page = fetch_page(page["nextPageToken"])
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+
+    def lines():
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is None:
+                    return
+                if isinstance(page, Exception):
+                    yield json.dumps({"error": f"Listing interrupted: {page}"}) + "\n"
+                    return
+                if page.get("files"):
+                    yield "".join(json.dumps(file) + "\n" for file in page["files"])
+        finally:
+            stopped.set()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+VIEW_ONLY_PERMISSION = {
+    "type": "anyone",
+    "role": "reader"  # This ensures view-only access
+}
 
-#     # Get the user's stored page history (default to an empty list)
-#     page_history = user_page_tokens.get(user_id, [])
-#     print(page_history)
-#     print(page_history)
-#     print(page_history)
-#     print(page_history)
-
-#     # If this is the first request (no `page_token` and `prev=False`), clear history
-#     if not page_token and not prev:
-#         user_page_tokens[user_id] = []  # Reset history
-
-#     if prev:
-#         if not page_history:
-#             raise HTTPException(status_code=400, detail="No previous page available")
-        
-#         # Get the last stored token and remove it from history
-#         page_token = page_history.pop()
-#         user_page_tokens[user_id] = page_history  # Update history
-
-#     response = drive_service.files().list(
-#         pageSize=10,
-#         fields="nextPageToken, files(id, name, mimeType, webViewLink)",
-#         pageToken=page_token
-#     ).execute()
-
-#     # Save the `nextPageToken` for future navigation (only if not going back)
-#     next_page_token = response.get("nextPageToken")
-#     if next_page_token and not prev:
-#         page_history.append(next_page_token)
-#         user_page_tokens[user_id] = page_history  # Store history
-
-#     return {
-#         "files": response.get("files", []),
-#         "nextPageToken": next_page_token,
-#         "hasPreviousPage": len(page_history) > 0  # True only if there is history
-#     }
+def uploaded_file_links(uploaded_file: dict, file_name: str):
+    """Build the upload response: file ID plus links that open in the correct Google Editor."""
+    file_id = uploaded_file["id"]
+    open_links = {
+        "application/vnd.google-apps.document": f"https://docs.google.com/document/d/{file_id}/edit",
+        "application/vnd.google-apps.spreadsheet": f"https://docs.google.com/spreadsheets/d/{file_id}/edit",
+        "application/vnd.google-apps.presentation": f"https://docs.google.com/presentation/d/{file_id}/edit",
+    }
+
+    return {
+        "fileId": file_id,
+        "fileName": file_name,
+        "editLink": open_links.get(uploaded_file["mimeType"], f"https://drive.google.com/file/d/{file_id}/view"),  # ✅ Opens in Docs, Sheets, or Slides
+        "viewLink": f"https://docs.google.com/document/d/{file_id}/view"
+    }
+
+def stream_upload(drive_service, file_stream, file_name: str, content_type: str, on_progress=None):
+    """
+    Upload a seekable stream through a Google resumable session in DRIVE_UPLOAD_CHUNK_SIZE chunks.
+    Only the chunk currently being sent is held in memory.
+    `on_progress(bytes_sent, total_bytes)` is called after every acknowledged chunk.
+    """
+    media = MediaIoBaseUpload(file_stream, mimetype=content_type, chunksize=DRIVE_UPLOAD_CHUNK_SIZE, resumable=True)
+
+    file_metadata = {
+        "name": file_name,
+        "mimeType": CONVERSION_MAP.get(content_type, content_type),
+        # "parents": [CENTRAL_DRIVE_FOLDER_ID] if CENTRAL_DRIVE_FOLDER_ID else None,
+    }
+    request = drive_service.files().create(body=file_metadata, media_body=media, fields="id, mimeType")
+
+    uploaded_file = None
+    bytes_sent = 0
+    while uploaded_file is None:
+        in_flight = min(DRIVE_UPLOAD_CHUNK_SIZE, media.size() - bytes_sent)
+        UPLOAD_BYTES_IN_FLIGHT.inc(in_flight)
+        try:
+            status, uploaded_file = request.next_chunk()
+        finally:
+            UPLOAD_BYTES_IN_FLIGHT.dec(in_flight)
 
+        acknowledged = status.resumable_progress if status else media.size()
+        UPLOAD_BYTES_TOTAL.inc(acknowledged - bytes_sent)
+        bytes_sent = acknowledged
+        if on_progress:
+            on_progress(bytes_sent, media.size())
+
+    return uploaded_file
 
 def upload_file_to_drive(db: Session, user_id: str, file: UploadFile):
     """Upload a file to Google Drive, convert it when possible, and return correct edit/view links."""
     drive_service = get_drive_service(db, user_id)
 
     try:
-        file_stream = io.BytesIO(file.file.read())  # Read file into memory
-        media = MediaIoBaseUpload(file_stream, mimetype=file.content_type, resumable=True)
-
-        converted_mimeType = CONVERSION_MAP.get(file.content_type, file.content_type)
-        print(file.content_type)
-        print(converted_mimeType)
-
-        file_metadata = {
-            "name": file.filename,
-            "mimeType": converted_mimeType,
-            # "parents": [CENTRAL_DRIVE_FOLDER_ID] if CENTRAL_DRIVE_FOLDER_ID else None,
-        }
-
-        # ✅ Upload file
-        uploaded_file = drive_service.files().create(
-            body=file_metadata, media_body=media, fields="id, mimeType"
-        ).execute()
+        # ✅ Upload file straight from the request spool, one chunk at a time
+        uploaded_file = stream_upload(drive_service, file.file, file.filename, file.content_type)
         file_id = uploaded_file["id"]
-        uploaded_mime_type = uploaded_file["mimeType"]
          # ✅ Set file to view-only
-        permission = {
-            "type": "anyone",
-            "role": "reader"  # This ensures view-only access
-        }
-        drive_service.permissions().create(fileId=file_id, body=permission).execute()
-        # ✅ Ensure it opens in the correct Google Editor
-        open_links = {
-            "application/vnd.google-apps.document": f"https://docs.google.com/document/d/{file_id}/edit",
-            "application/vnd.google-apps.spreadsheet": f"https://docs.google.com/spreadsheets/d/{file_id}/edit",
-            "application/vnd.google-apps.presentation": f"https://docs.google.com/presentation/d/{file_id}/edit",
-        }
-
-        edit_link = open_links.get(uploaded_mime_type, f"https://drive.google.com/file/d/{file_id}/view")
-        view_link = f"https://docs.google.com/document/d/{file_id}/view"
+        drive_service.permissions().create(fileId=file_id, body=VIEW_ONLY_PERMISSION).execute()
 
-        return JSONResponse(content={
-            "fileId": file_id,
-            "fileName": file.filename,
-            "editLink": edit_link,  # ✅ Now correctly opens in Docs, Sheets, or Slides
-            "viewLink": view_link
-        })
+        return JSONResponse(content=uploaded_file_links(uploaded_file, file.filename))
 
     except HttpError as error:
-        raise HTTPException(status_code=500, detail=f"Google Drive API error: {error}")
+        raise drive_api_error(error)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+def detach_spool(file: UploadFile):
+    """Take ownership of an UploadFile's spool; FastAPI closes form files as soon as the endpoint returns."""
+    spool = file.file
+    file.file = io.BytesIO()
+    return spool
+
+def _grant_view_permissions(drive_service, uploaded: list):
+    """Make uploaded files view-only with one Drive batch HTTP request; returns {file_id: error or None}."""
+    errors = {}
+
+    def on_response(request_id, response, exception):
+        errors[request_id] = exception
+
+    batch = drive_service.new_batch_http_request(callback=on_response)
+    for uploaded_file, _ in uploaded:
+        batch.add(drive_service.permissions().create(fileId=uploaded_file["id"], body=VIEW_ONLY_PERMISSION), request_id=uploaded_file["id"])
+    batch.execute()
+    return errors
+
+def upload_files_to_drive_batch(db: Session, user_id: str, files: list):
+    """
+    Upload many files with bounded concurrency and stream one NDJSON result line per file.
+    View-only permissions are granted in Drive batch requests of up to DRIVE_PERMISSION_BATCH_SIZE files.
+    """
+    drive_service = get_drive_service(db, user_id)
+    pending_uploads = [(detach_spool(file), file.filename, file.content_type) for file in files]
+
+    def upload_one(spool, file_name, content_type):
+        try:
+            with outbound_priority(BULK):
+                return stream_upload(drive_service, spool, file_name, content_type)
+        finally:
+            spool.close()
+
+    def results():
+        executor = ThreadPoolExecutor(max_workers=DRIVE_BATCH_UPLOAD_CONCURRENCY)
+        try:
+            futures = {executor.submit(upload_one, *upload): upload[1] for upload in pending_uploads}
+            uploaded = []
+            remaining = len(futures)
+            for future in as_completed(futures):
+                remaining -= 1
+                file_name = futures[future]
+                try:
+                    uploaded.append((future.result(), file_name))
+                except Exception as e:
+                    yield json.dumps({"fileName": file_name, "error": f"Upload failed: {e}"}) + "\n"
+
+                if uploaded and (len(uploaded) >= DRIVE_PERMISSION_BATCH_SIZE or remaining == 0):
+                    try:
+                        errors = _grant_view_permissions(drive_service, uploaded)
+                    except HttpError as error:
+                        errors = {uploaded_file["id"]: error for uploaded_file, _ in uploaded}
+                    for uploaded_file, name in uploaded:
+                        result = uploaded_file_links(uploaded_file, name)
+                        if errors.get(uploaded_file["id"]):
+                            result["error"] = f"Failed to set view-only permission: {errors[uploaded_file['id']]}"
+                        yield json.dumps(result) + "\n"
+                    uploaded = []
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for spool, _, _ in pending_uploads:
+                spool.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 # def upload_file_to_drive(db: Session, user_id: str, file: UploadFile):
 #     """Upload a file to Google Drive, restrict it to view-only, and ensure it opens in Google Docs."""
 #     drive_service = get_drive_service(db, user_id)
@@ -269,40 +540,196 @@ def create_google_file(db: Session, user_id: str, title: str, file_type: str, us
         }
 
     except HttpError as error:
-        raise HTTPException(status_code=500, detail=str(error))
-
-def download_file(db: Session, user_id: str, file_id: str):
-    """Download a file from Google Drive and return it as a stream."""
+        raise drive_api_error(error)
+
+REVALIDATE = "private, no-cache"  # Browsers may keep a copy but must revalidate it with If-None-Match
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that identify a representation."""
+    return '"' + hashlib.sha256("\0".join(str(part) for part in parts).encode()).hexdigest()[:32] + '"'
+
+def file_etag(file_metadata: dict, export_mime: str = None) -> str:
+    """
+    ETag for a file's content: Drive's md5Checksum for binary files,
+    otherwise version + modifiedTime (Google-native files have no checksum) plus the export format.
+    """
+    if file_metadata.get("md5Checksum") and not export_mime:
+        return make_etag(file_metadata["id"], file_metadata["md5Checksum"])
+    return make_etag(file_metadata["id"], file_metadata.get("version"), file_metadata.get("modifiedTime"), export_mime)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires): '*' or any listed tag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def not_modified(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+def json_with_etag(payload: dict, if_none_match: str = None):
+    """JSON response tagged with a strong ETag of its body; 304 when the client already has it."""
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = make_etag(hashlib.sha256(body).hexdigest())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+def parse_range_header(range_header: str, file_size: int):
+    """
+    Parse a single `bytes=` Range header into an inclusive (start, end) pair.
+    Returns None when the header is absent or not a single byte range (serve the whole file).
+    Raises 416 when the range cannot be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start, _, end = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start:
+            first, last = int(start), int(end) if end else file_size - 1
+        else:
+            first, last = max(file_size - int(end), 0), file_size - 1  # Suffix range: last N bytes
+    except ValueError:
+        return None
+
+    if first >= file_size or first > last:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"},
+        )
+    return first, min(last, file_size - 1)
+
+def iter_media_range(request, start: int, end: int):
+    """Fetch bytes [start, end] of a get_media request from Drive in DRIVE_DOWNLOAD_CHUNK_SIZE ranges, yielding each as it arrives."""
+    request = timed_media(request)
+    position = start
+    while position <= end:
+        chunk_end = min(position + DRIVE_DOWNLOAD_CHUNK_SIZE - 1, end)
+        headers = dict(request.headers, range=f"bytes={position}-{chunk_end}")
+        response, content = request.http.request(request.uri, method="GET", headers=headers)
+        if response.status not in (200, 206):
+            raise HttpError(response, content, uri=request.uri)
+
+        if response.status == 200:
+            # Upstream ignored the range and sent the whole body
+            content = content[position:end + 1]
+            end = position + len(content) - 1
+
+        if not content:
+            return
+        DOWNLOAD_BYTES_TOTAL.inc(len(content))
+        yield content
+        position += len(content)
+
+def iter_media_download(request):
+    """Download a media request (e.g. an export) with MediaIoBaseDownload, yielding each chunk as it arrives."""
+    buffer = io.BytesIO()
+    downloader = MediaIoBaseDownload(buffer, timed_media(request), chunksize=DRIVE_DOWNLOAD_CHUNK_SIZE)
+    done = False
+    while not done:
+        _, done = downloader.next_chunk()
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if chunk:
+            DOWNLOAD_BYTES_TOTAL.inc(len(chunk))
+            yield chunk
+
+def shared_download(key, make_chunks, size: int = None):
+    """
+    Stream an upstream body, joining an identical download already in flight (one Google call for all of them).
+    `size` is the body length when known; bodies too large to buffer for sharing are streamed unshared.
+    """
+    return _shared_downloads.open(key, make_chunks, size) if DRIVE_COALESCE_ENABLED else make_chunks()
+
+def download_file(db: Session, user_id: str, file_id: str, range_header: str = None,
+                  if_none_match: str = None, if_range: str = None):
+    """
+    Download a file from Google Drive and stream it to the client chunk by chunk.
+    Binary files honor a single `Range` header by forwarding the byte range upstream.
+    Responses carry a strong ETag; a matching `If-None-Match` gets a 304 after only the metadata call.
+    Concurrent identical downloads of the same user share one metadata call and one upstream body.
+    """
     drive_service = get_drive_service(db, user_id)
 
     try:
-        # Fetch file metadata
-        file_metadata = drive_service.files().get(fileId=file_id).execute()
+        # Fetch only the metadata we need
+        metadata_fields = "id, name, mimeType, size, md5Checksum, version, modifiedTime"
+        file_metadata = coalesce(
+            _metadata_calls, (str(user_id), file_id, metadata_fields),
+            drive_service.files().get(fileId=file_id, fields=metadata_fields).execute,
+        )
         file_name = file_metadata["name"]
         mime_type = file_metadata["mimeType"]
+        headers = {}
+        status_code = 200
+
+        export_mime, file_extension = EXPORT_FORMATS.get(mime_type, (None, ""))
+        etag = file_etag(file_metadata, export_mime)
+        # ✅ The client already has these bytes: answer without touching the content
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        headers["ETag"] = etag
+        headers["Cache-Control"] = REVALIDATE
+        if if_range and if_range.strip() != etag:
+            range_header = None  # Representation changed since the client's partial copy: send it whole
 
         # Handle export for Google Docs, Sheets, and Slides
-        if mime_type in EXPORT_FORMATS:
-            export_mime, file_extension = EXPORT_FORMATS[mime_type]
-            file_data = drive_service.files().export(fileId=file_id, mimeType=export_mime).execute()
+        if export_mime:
+            cache_path = None
+            if EXPORT_CACHE_ENABLED and file_metadata.get("version") and file_metadata.get("modifiedTime"):
+                cache_path = export_cache_path(file_id, export_mime, file_metadata["version"], file_metadata["modifiedTime"])
+                # ✅ Unchanged document: serve the previous export straight from disk (Range supported)
+                if get_cached_export(cache_path):
+                    sanitized_file_name = file_name.replace(" ", "_") + file_extension
+                    headers["Content-Disposition"] = f'attachment; filename="{sanitized_file_name}"'
+                    return FileResponse(cache_path, media_type=export_mime, headers=headers)
+
+            def export_chunks():
+                chunks = iter_media_download(drive_service.files().export_media(fileId=file_id, mimeType=export_mime))
+                return cache_export_stream(cache_path, chunks) if cache_path else chunks
+
+            chunks = shared_download((str(user_id), file_id, etag, export_mime), export_chunks)
             final_mime_type = export_mime
+            headers["Accept-Ranges"] = "none"  # Export size is unknown up front
         else:
             # Download normal files
             request = drive_service.files().get_media(fileId=file_id)
-            file_data = request.execute()
-            file_extension = ""  # Keep original extension
             final_mime_type = mime_type
 
+            if "size" in file_metadata:
+                file_size = int(file_metadata["size"])
+                byte_range = parse_range_header(range_header, file_size)
+                start, end = byte_range or (0, file_size - 1)
+                chunks = shared_download(
+                    (str(user_id), file_id, etag, start, end), lambda: iter_media_range(request, start, end), end - start + 1
+                )
+                headers["Accept-Ranges"] = "bytes"
+                headers["Content-Length"] = str(end - start + 1)
+                if byte_range:
+                    status_code = 206
+                    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            else:
+                chunks = shared_download((str(user_id), file_id, etag), lambda: iter_media_download(request))
+
+        # Pull the first chunk now so upstream errors still become proper HTTP errors
+        first_chunk = next(chunks, b"")
+
         # Ensure correct filename extension
         sanitized_file_name = file_name.replace(" ", "_") + file_extension
-        file_stream = io.BytesIO(file_data)
+        headers["Content-Disposition"] = f'attachment; filename="{sanitized_file_name}"'
+        headers["Content-Type"] = final_mime_type
 
-        return StreamingResponse(file_stream, media_type=final_mime_type, headers={
-            "Content-Disposition": f'attachment; filename="{sanitized_file_name}"',
-            "Content-Type": final_mime_type
-        })
+        return StreamingResponse(
+            itertools.chain([first_chunk], chunks), status_code=status_code, media_type=final_mime_type, headers=headers
+        )
 
+    except HTTPException:
+        raise
     except HttpError as error:
-        raise HTTPException(status_code=500, detail=f"Google Drive API error: {error}")
+        raise drive_api_error(error)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,297 @@
+import time
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from googleapiclient.errors import HttpError
+from app.models.drive_tree import DriveTreeNode, DriveTreeCrawl
+from app.redis_client import redis_client
+from app.scheduler import outbound_priority, BULK
+from app.services.drive_service import get_drive_service, drive_api_error, parse_drive_time
+from app.metrics import Counter, Histogram
+from app.config import DRIVE_TREE_CRAWL_CONCURRENCY, DRIVE_TREE_MAX_STALENESS, DRIVE_TREE_MAX_NODES
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Folder tree index: a crawl lists many folders at once on a bounded pool and stores every node with
+# its materialized ancestry ("/root/a/b/") and path ("A/B/name"), plus recursive sizes on folders.
+# Subtrees are then one ancestry prefix scan, folder sizes one indexed read and paths one hash lookup.
+
+TREE_CRAWL_SECONDS = Histogram("drive_tree_crawl_seconds", "Folder tree crawl duration", buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+TREE_CRAWL_FOLDERS = Counter("drive_tree_crawl_folders_total", "Folders listed by tree crawls")
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+CHILD_FIELDS = "nextPageToken, files(id, name, mimeType, size, modifiedTime)"
+INSERT_BATCH_SIZE = 1000
+ANCESTRY_MAX_LENGTH = 2048  # DriveTreeNode.ancestry column size
+
+
+def _path_hash(path: str) -> str:
+    return hashlib.sha256(path.encode()).hexdigest()
+
+
+def _node_row(user_id: str, file: dict, parent: dict = None):
+    if parent is None:
+        path, ancestry = "", "/"
+    else:
+        path = f"{parent['path']}/{file['name']}" if parent["path"] else file["name"]
+        ancestry = f"{parent['ancestry']}{parent['file_id']}/"
+    if len(ancestry) > ANCESTRY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail="Folder tree is too deep to index")
+    is_folder = file["mimeType"] == FOLDER_MIME_TYPE
+    return {
+        "user_id": str(user_id),
+        "file_id": file["id"],
+        "parent_id": parent["file_id"] if parent else None,
+        "name": file["name"],
+        "mime_type": file["mimeType"],
+        "is_folder": is_folder,
+        "size": 0 if is_folder else int(file.get("size", 0)),  # Google-native files take no quota
+        "file_count": 0 if is_folder else None,
+        "depth": parent["depth"] + 1 if parent else 0,
+        "ancestry": ancestry,
+        "path": path,
+        "path_hash": _path_hash(path),
+        "modified_time": parse_drive_time(file.get("modifiedTime")),
+    }
+
+
+def _list_children(drive_service, folder_id: str):
+    """Every non-trashed child of one folder (all pages)."""
+    children, page_token = [], None
+    with outbound_priority(BULK):
+        while True:
+            response = drive_service.files().list(
+                q=f"'{folder_id}' in parents and trashed = false",
+                pageSize=1000,
+                fields=CHILD_FIELDS,
+                pageToken=page_token,
+            ).execute()
+            children.extend(response.get("files", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return children
+
+
+def _sum_folder_sizes(nodes: dict):
+    """Roll file sizes and counts up into every ancestor folder, deepest first."""
+    for node in sorted(nodes.values(), key=lambda node: node["depth"], reverse=True):
+        parent = nodes.get(node["parent_id"])
+        if parent is None:
+            continue
+        parent["size"] += node["size"]
+        parent["file_count"] += node["file_count"] if node["is_folder"] else 1
+
+
+def crawl_folder_tree(db: Session, user_id: str, root_id: str = "root"):
+    """
+    Crawl everything under `root_id` (My Drive by default) and replace the user's tree index with it.
+    Up to DRIVE_TREE_CRAWL_CONCURRENCY folders are listed at once; each folder's subfolders are queued
+    as soon as its listing arrives, so the crawl fans out level by level without waiting on siblings.
+    """
+    started = time.perf_counter()
+    drive_service = get_drive_service(db, user_id)
+    try:
+        root = drive_service.files().get(fileId=root_id, fields="id, name, mimeType, modifiedTime").execute()
+    except HttpError as error:
+        raise drive_api_error(error)
+    if root["mimeType"] != FOLDER_MIME_TYPE:
+        raise HTTPException(status_code=400, detail="folder_id is not a folder")
+
+    root_row = _node_row(user_id, root)
+    nodes = {root_row["file_id"]: root_row}
+    executor = ThreadPoolExecutor(max_workers=DRIVE_TREE_CRAWL_CONCURRENCY, thread_name_prefix="tree-crawl")
+    try:
+        pending = {executor.submit(_list_children, drive_service, root_row["file_id"]): root_row}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                parent = pending.pop(future)
+                TREE_CRAWL_FOLDERS.inc()
+                for child in future.result():
+                    if child["id"] in nodes:
+                        continue  # Listed twice (moved during the crawl)
+                    row = nodes[child["id"]] = _node_row(user_id, child, parent)
+                    if row["is_folder"]:
+                        pending[executor.submit(_list_children, drive_service, row["file_id"])] = row
+                if len(nodes) > DRIVE_TREE_MAX_NODES:
+                    raise HTTPException(status_code=400, detail=f"Folder tree has more than {DRIVE_TREE_MAX_NODES} items")
+    except HttpError as error:
+        raise drive_api_error(error)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    _sum_folder_sizes(nodes)
+
+    rows = list(nodes.values())
+    db.query(DriveTreeNode).filter(DriveTreeNode.user_id == str(user_id)).delete()
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.bulk_insert_mappings(DriveTreeNode, rows[start:start + INSERT_BATCH_SIZE])
+
+    duration = time.perf_counter() - started
+    crawl = DriveTreeCrawl(
+        user_id=str(user_id),
+        root_id=root_row["file_id"],
+        folder_count=sum(1 for row in rows if row["is_folder"]),
+        file_count=root_row["file_count"],
+        duration_seconds=duration,
+        crawled_at=datetime.utcnow(),
+    )
+    db.merge(crawl)
+    db.commit()
+    TREE_CRAWL_SECONDS.observe(duration)
+    logger.info(f"Crawled folder tree for user {user_id}: {len(rows)} items in {duration:.2f}s")
+    return crawl
+
+
+def _latest_crawl(db: Session, user_id: str):
+    return db.query(DriveTreeCrawl).filter(DriveTreeCrawl.user_id == str(user_id)).first()
+
+
+def _is_crawled_root(db: Session, user_id: str, root_id: str, crawl: DriveTreeCrawl) -> bool:
+    """Whether `root_id` (None: whichever root was crawled, "root": My Drive) is the folder `crawl` indexed."""
+    if root_id is None or root_id == crawl.root_id:
+        return True
+    if root_id != "root":
+        return False
+    # The crawl stores My Drive's real id, so resolve the alias before comparing
+    try:
+        return get_drive_service(db, user_id).files().get(fileId="root", fields="id").execute()["id"] == crawl.root_id
+    except HttpError as error:
+        raise drive_api_error(error)
+
+
+def refresh_tree(db: Session, user_id: str, max_staleness: int = None, root_id: str = None, force: bool = False):
+    """
+    Return the user's latest crawl, crawling first if there is none, it is older than `max_staleness` seconds
+    (DRIVE_TREE_MAX_STALENESS by default) or `force` is set. Reads use whichever root was crawled last.
+    """
+    max_staleness = DRIVE_TREE_MAX_STALENESS if max_staleness is None else max_staleness
+    requested_at = datetime.utcnow()
+    crawl = _latest_crawl(db, user_id)
+    if not force and crawl and crawl.crawled_at >= requested_at - timedelta(seconds=max_staleness):
+        return crawl
+
+    # Only one worker crawls a user at a time; the others wait for it and use its result
+    lock = redis_client.lock(f"drive_tree_lock:{user_id}", timeout=600)
+    try:
+        acquired = lock.acquire(blocking=True, blocking_timeout=600)
+    except Exception as e:
+        logger.error(f"Error acquiring drive tree lock, crawling without it: {e}")
+        acquired, lock = True, None
+    if not acquired:
+        raise HTTPException(status_code=503, detail="Folder tree crawl is taking too long, try again later")
+
+    try:
+        db.expire_all()
+        crawl = _latest_crawl(db, user_id)
+        fresh_since = requested_at if force else requested_at - timedelta(seconds=max_staleness)
+        if crawl and crawl.crawled_at >= fresh_since and _is_crawled_root(db, user_id, root_id, crawl):
+            return crawl  # Another worker crawled it while we waited
+        return crawl_folder_tree(db, user_id, root_id or (crawl.root_id if crawl else "root"))
+    finally:
+        if lock:
+            try:
+                lock.release()
+            except Exception as e:
+                logger.warning(f"Error releasing drive tree lock: {e}")
+
+
+def _node_json(node: DriveTreeNode):
+    return {
+        "id": node.file_id,
+        "name": node.name,
+        "mimeType": node.mime_type,
+        "isFolder": node.is_folder,
+        "parentId": node.parent_id,
+        "path": node.path,
+        "depth": node.depth,
+        "size": node.size,
+        "fileCount": node.file_count,
+        "modifiedTime": node.modified_time.isoformat() + "Z" if node.modified_time else None,
+    }
+
+
+def _crawl_json(crawl: DriveTreeCrawl):
+    return {
+        "rootId": crawl.root_id,
+        "folders": crawl.folder_count,
+        "files": crawl.file_count,
+        "crawledAt": crawl.crawled_at.isoformat() + "Z",
+        "durationSeconds": crawl.duration_seconds,
+    }
+
+
+def _get_folder(db: Session, user_id: str, crawl: DriveTreeCrawl, folder_id: str = None) -> DriveTreeNode:
+    folder_id = crawl.root_id if folder_id in (None, "root") else folder_id
+    folder = db.query(DriveTreeNode).filter(DriveTreeNode.user_id == str(user_id), DriveTreeNode.file_id == folder_id).first()
+    if not folder or not folder.is_folder:
+        raise HTTPException(status_code=404, detail="Folder not found in the folder tree index")
+    return folder
+
+
+def start_tree_crawl(db: Session, user_id: str, folder_id: str = "root"):
+    """Crawl now (unless another worker is already doing so) and report what was indexed."""
+    return _crawl_json(refresh_tree(db, user_id, root_id=folder_id, force=True))
+
+
+def get_subtree(db: Session, user_id: str, folder_id: str = None, max_depth: int = None, max_staleness: int = None):
+    """Everything under a folder, ordered by path, in one ancestry prefix scan."""
+    crawl = refresh_tree(db, user_id, max_staleness)
+    folder = _get_folder(db, user_id, crawl, folder_id)
+
+    query = db.query(DriveTreeNode).filter(
+        DriveTreeNode.user_id == str(user_id),
+        DriveTreeNode.ancestry.startswith(f"{folder.ancestry}{folder.file_id}/", autoescape=True),
+    )
+    if max_depth is not None:
+        query = query.filter(DriveTreeNode.depth <= folder.depth + max_depth)
+
+    return {
+        "folder": _node_json(folder),
+        "items": [_node_json(node) for node in query.order_by(DriveTreeNode.path).all()],
+        "crawl": _crawl_json(crawl),
+    }
+
+
+def get_folder_sizes(db: Session, user_id: str, folder_id: str = None, max_staleness: int = None):
+    """A folder's total size and file count plus those of each direct subfolder (sizes are precomputed by the crawl)."""
+    crawl = refresh_tree(db, user_id, max_staleness)
+    folder_id = crawl.root_id if folder_id in (None, "root") else folder_id
+
+    folders = (
+        db.query(DriveTreeNode)
+        .filter(
+            DriveTreeNode.user_id == str(user_id),
+            DriveTreeNode.is_folder.is_(True),
+            (DriveTreeNode.file_id == folder_id) | (DriveTreeNode.parent_id == folder_id),
+        )
+        .order_by(DriveTreeNode.size.desc())
+        .all()
+    )
+    folder = next((node for node in folders if node.file_id == folder_id), None)
+    if folder is None:
+        raise HTTPException(status_code=404, detail="Folder not found in the folder tree index")
+
+    return {
+        "folder": _node_json(folder),
+        "subfolders": [_node_json(node) for node in folders if node is not folder],
+        "crawl": _crawl_json(crawl),
+    }
+
+
+def lookup_path(db: Session, user_id: str, path: str, max_staleness: int = None):
+    """Items at a path like 'Projects/2024/report.pdf' relative to the crawl root (Drive allows duplicate names)."""
+    crawl = refresh_tree(db, user_id, max_staleness)
+    path = "/".join(part for part in path.split("/") if part)
+    nodes = (
+        db.query(DriveTreeNode)
+        .filter(DriveTreeNode.user_id == str(user_id), DriveTreeNode.path_hash == _path_hash(path))
+        .all()
+    )
+    matches = [node for node in nodes if node.path == path]  # Guard against hash collisions
+    if not matches:
+        raise HTTPException(status_code=404, detail="No file or folder at this path")
+    return {"items": [_node_json(node) for node in matches], "crawl": _crawl_json(crawl)}
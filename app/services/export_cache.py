@@ -0,0 +1,110 @@
+import os
+import time
+import hashlib
+import logging
+import tempfile
+from app.cache import CACHE_REQUESTS
+from app.metrics import Counter, Gauge
+from app.config import EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES, EXPORT_CACHE_EVICT_GRACE
+
+logger = logging.getLogger(__name__)
+
+# 🔹 On-disk cache of Docs/Sheets/Slides exports, shared by every worker on the host.
+# Entries are immutable (the key includes the file's version), so they never need invalidating;
+# the directory is kept under EXPORT_CACHE_MAX_BYTES by evicting the least recently used files.
+# Entries used in the last EXPORT_CACHE_EVICT_GRACE seconds are never evicted, so a path handed out
+# by get_cached_export (e.g. to a FileResponse, which opens it later) stays in place until it is opened.
+
+EXPORT_CACHE_BYTES = Gauge("drive_export_cache_bytes", "Bytes held by the on-disk export cache")
+EXPORT_CACHE_EVICTIONS = Counter("drive_export_cache_evictions_total", "Exports evicted from the on-disk cache")
+
+PARTIAL_SUFFIX = ".part"
+
+os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+
+
+def export_cache_path(file_id: str, export_mime: str, version: str, modified_time: str) -> str:
+    """Path of the cached export for this exact revision of a file."""
+    key = hashlib.sha256(f"{file_id}\0{export_mime}\0{version}\0{modified_time}".encode()).hexdigest()
+    return os.path.join(EXPORT_CACHE_DIR, key)
+
+
+def get_cached_export(path: str):
+    """Return `path` if the export is cached (marking it recently used), else None."""
+    try:
+        os.utime(path)  # mtime doubles as the LRU timestamp
+    except FileNotFoundError:
+        CACHE_REQUESTS.inc(cache="drive_export", result="miss")
+        return None
+    CACHE_REQUESTS.inc(cache="drive_export", result="hit_local")
+    return path
+
+
+def _discard(partial):
+    partial.close()
+    try:
+        os.unlink(partial.name)
+    except FileNotFoundError:
+        pass
+
+
+def cache_export_stream(path: str, chunks):
+    """
+    Pass export chunks through while writing them to the cache.
+    The file is written under a temporary name and renamed only once the export completed,
+    so readers never see a partial export. Cache write failures never interrupt the download.
+    """
+    try:
+        partial = tempfile.NamedTemporaryFile(dir=EXPORT_CACHE_DIR, suffix=PARTIAL_SUFFIX, delete=False)
+    except OSError as e:
+        logger.error(f"Error creating export cache entry: {e}")
+        partial = None
+
+    try:
+        for chunk in chunks:
+            if partial is not None:
+                try:
+                    partial.write(chunk)
+                except OSError as e:
+                    logger.error(f"Error writing export cache entry: {e}")
+                    _discard(partial)
+                    partial = None
+            yield chunk
+
+        if partial is not None:
+            try:
+                partial.close()
+                os.replace(partial.name, path)
+                partial = None
+                evict_exports()
+            except OSError as e:
+                logger.error(f"Error storing export cache entry: {e}")
+    finally:
+        if partial is not None:
+            _discard(partial)
+
+
+def evict_exports():
+    """Delete least recently used exports (outside the grace period) until the cache fits in EXPORT_CACHE_MAX_BYTES."""
+    in_use_since = time.time() - EXPORT_CACHE_EVICT_GRACE
+    entries = []
+    for entry in os.scandir(EXPORT_CACHE_DIR):
+        if entry.name.endswith(PARTIAL_SUFFIX):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in sorted(entries):
+        if total <= EXPORT_CACHE_MAX_BYTES or mtime >= in_use_since:
+            break  # Sorted by mtime: everything from here on was used too recently
+        try:
+            os.unlink(path)
+            EXPORT_CACHE_EVICTIONS.inc()
+        except FileNotFoundError:
+            pass  # Already evicted by another worker
+        total -= size
+    EXPORT_CACHE_BYTES.set(total)
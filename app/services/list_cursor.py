@@ -0,0 +1,51 @@
+import hmac
+import json
+import zlib
+import base64
+import hashlib
+from fastapi import HTTPException
+from app.config import SECRET_KEY, DRIVE_LIST_CURSOR_HISTORY
+
+# 🔹 Stateless listing cursors: a cursor carries the Drive page tokens of the pages before it,
+# signed with SECRET_KEY and bound to the user, so any worker can serve next/previous/jump
+# without server-side history. Only the last DRIVE_LIST_CURSOR_HISTORY tokens are kept.
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(user_id: str, payload: bytes) -> bytes:
+    return hmac.new(SECRET_KEY.encode(), str(user_id).encode() + b"\0" + payload, hashlib.sha256).digest()[:16]
+
+
+def encode_cursor(user_id: str, page: int, tokens: list, seek: int = None) -> str:
+    """
+    Cursor for page number `page`; `tokens` are the Drive page tokens of the pages up to and including it
+    (None for page 1), oldest first. `seek` makes the cursor move to that page first (used for previous
+    pages the history has already forgotten).
+    """
+    state = {"n": page, "t": tokens[-DRIVE_LIST_CURSOR_HISTORY:]}
+    if seek:
+        state["s"] = seek
+    payload = zlib.compress(json.dumps(state, separators=(",", ":")).encode())
+    return f"{_b64encode(payload)}.{_b64encode(_signature(user_id, payload))}"
+
+
+def decode_cursor(cursor: str, user_id: str):
+    """Return (page, tokens, seek) from a cursor issued to this user; 400 if it was tampered with or is someone else's."""
+    try:
+        payload, signature = (_b64decode(part) for part in cursor.split("."))
+        if not hmac.compare_digest(signature, _signature(user_id, payload)):
+            raise ValueError("bad signature")
+        state = json.loads(zlib.decompress(payload))
+        page, tokens, seek = int(state["n"]), list(state["t"]), state.get("s")
+        if page < 1 or not tokens or len(tokens) > page or (seek is not None and int(seek) < 1):
+            raise ValueError("bad cursor")
+    except (ValueError, KeyError, TypeError, zlib.error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page, tokens, seek
@@ -0,0 +1,221 @@
+import re
+import json
+import uuid
+import logging
+import anyio.from_thread
+import requests
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from google.auth.transport.requests import AuthorizedSession
+from googleapiclient.errors import HttpError
+from app.redis_client import redis_client
+from app.http_client import http_session, use_shared_pool, scheduled_request
+from app.services.drive_service import (
+    get_drive_credentials, get_drive_service, drive_api_error, uploaded_file_links, VIEW_ONLY_PERMISSION, CONVERSION_MAP
+)
+from app.metrics import UPLOAD_BYTES_IN_FLIGHT, UPLOAD_BYTES_TOTAL
+from app.config import GOOGLE_API_ROOT_URL, RESUMABLE_UPLOAD_SESSION_TTL
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Client-driven resumable uploads, passed chunk by chunk straight into a Google resumable session.
+# Session state ("upload_session:{id}": Google session URI, size, confirmed offset) lives in Redis,
+# so a client can continue on any worker, including after a restart.
+
+CHUNK_GRANULARITY = 256 * 1024  # Google requires every chunk except the last to be a multiple of this
+UPLOAD_SESSION_URL = f"{GOOGLE_API_ROOT_URL}upload/drive/v3/files?uploadType=resumable&fields=id,mimeType"
+
+
+def _session_key(upload_id: str) -> str:
+    return f"upload_session:{upload_id}"
+
+
+def _load_session(user_id: str, upload_id: str) -> dict:
+    try:
+        session = redis_client.hgetall(_session_key(upload_id))
+    except Exception as e:
+        logger.error(f"Error reading upload session {upload_id}: {e}")
+        raise HTTPException(status_code=503, detail="Upload sessions are unavailable")
+    if not session or session.get("user_id") != str(user_id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+def _save_session(upload_id: str, **fields):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(_session_key(upload_id), mapping=fields)
+    pipe.expire(_session_key(upload_id), RESUMABLE_UPLOAD_SESSION_TTL)
+    pipe.execute()
+
+
+def _session_status(upload_id: str, session: dict) -> dict:
+    return {
+        "uploadId": upload_id,
+        "fileName": session["file_name"],
+        "size": int(session["size"]),
+        "offset": int(session["offset"]),
+        "complete": "file" in session,
+        "chunkGranularity": CHUNK_GRANULARITY,
+    }
+
+
+def _apply_google_response(upload_id: str, session: dict, response: requests.Response) -> dict:
+    """Record what Google acknowledged (308 = partial, 200/201 = complete) and return the session status."""
+    if response.status_code == 308:
+        # "Range: bytes=0-N" is everything Google has persisted; no header means nothing yet
+        match = re.match(r"bytes=0-(\d+)", response.headers.get("Range", ""))
+        session["offset"] = str(int(match.group(1)) + 1 if match else 0)
+    elif response.status_code in (200, 201):
+        session["offset"] = session["size"]
+        session["file"] = json.dumps(response.json())
+    elif response.status_code in (404, 410):
+        redis_client.delete(_session_key(upload_id))
+        raise HTTPException(status_code=410, detail="Upload session expired; start a new upload")
+    else:
+        raise HTTPException(status_code=502, detail=f"Google upload session error: HTTP {response.status_code}")
+
+    _save_session(upload_id, **session)
+    return _session_status(upload_id, session)
+
+
+def create_upload_session(db: Session, user_id: str, file_name: str, content_type: str, size: int):
+    """Open a Google resumable session for a file of `size` bytes and return our upload id for it."""
+    content_type = content_type or "application/octet-stream"
+    google = use_shared_pool(AuthorizedSession(get_drive_credentials(db, user_id)))
+    response = scheduled_request(
+        google, "POST", UPLOAD_SESSION_URL, user_id,
+        json={"name": file_name, "mimeType": CONVERSION_MAP.get(content_type, content_type)},
+        headers={"X-Upload-Content-Type": content_type, "X-Upload-Content-Length": str(size)},
+    )
+    if response.status_code != 200 or "Location" not in response.headers:
+        raise HTTPException(status_code=502, detail=f"Failed to start Google upload session: HTTP {response.status_code}")
+
+    upload_id = uuid.uuid4().hex
+    session = {
+        "user_id": str(user_id),
+        "session_uri": response.headers["Location"],
+        "file_name": file_name,
+        "content_type": content_type,
+        "size": str(size),
+        "offset": "0",
+    }
+    try:
+        _save_session(upload_id, **session)
+    except Exception as e:
+        logger.error(f"Error saving upload session: {e}")
+        raise HTTPException(status_code=503, detail="Upload sessions are unavailable")
+    return _session_status(upload_id, session)
+
+
+class _ChunkReader:
+    """
+    File-like view of the request body for requests' upload (sized, so it sends Content-Length).
+    Runs on a worker thread and pulls each ASGI body message from the event loop as it is needed,
+    so at most one message is held in memory.
+    """
+
+    def __init__(self, body_stream, length: int):
+        self._body = body_stream.__aiter__()
+        self._length = length
+        self._buffer = b""
+        self._done = False
+        self.read_bytes = 0
+
+    def __len__(self):
+        return self._length
+
+    def _next_message(self):
+        try:
+            return anyio.from_thread.run(self._body.__anext__)
+        except StopAsyncIteration:
+            self._done = True
+            return b""
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            self._buffer += self._next_message()
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.read_bytes += len(data)
+        return data
+
+
+def upload_chunk(user_id: str, upload_id: str, offset: int, length: int, body_stream):
+    """
+    Forward one chunk, starting at `offset`, to the Google session without buffering it.
+    Returns the offset Google confirmed; the client resumes from there.
+    """
+    session = _load_session(user_id, upload_id)
+    size, expected = int(session["size"]), int(session["offset"])
+    if "file" in session:
+        return _session_status(upload_id, session)
+    if offset != expected:
+        raise HTTPException(status_code=409, detail=f"Expected offset {expected}", headers={"Upload-Offset": str(expected)})
+    if length <= 0 or offset + length > size:
+        raise HTTPException(status_code=400, detail=f"Chunk must be 1..{size - offset} bytes")
+    if offset + length < size and length % CHUNK_GRANULARITY:
+        raise HTTPException(status_code=400, detail=f"Chunks other than the last must be a multiple of {CHUNK_GRANULARITY} bytes")
+
+    # One writer per session across all workers
+    lock = redis_client.lock(f"upload_session_lock:{upload_id}", timeout=600)
+    if not lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Another chunk for this upload is in progress")
+
+    try:
+        reader = _ChunkReader(body_stream, length)
+        UPLOAD_BYTES_IN_FLIGHT.inc(length)
+        try:
+            response = scheduled_request(
+                http_session, "PUT", session["session_uri"], user_id,
+                data=reader,
+                headers={"Content-Range": f"bytes {offset}-{offset + length - 1}/{size}"},
+            )
+        except requests.RequestException as e:
+            # Google may have persisted part of the chunk; ask it where to resume
+            logger.warning(f"Chunk upload for session {upload_id} failed: {e}")
+            return query_upload_session(user_id, upload_id)
+        finally:
+            UPLOAD_BYTES_IN_FLIGHT.dec(length)
+
+        if reader.read_bytes < length:
+            raise HTTPException(status_code=400, detail="Request body shorter than Content-Length")
+        status = _apply_google_response(upload_id, session, response)
+        UPLOAD_BYTES_TOTAL.inc(max(0, status["offset"] - offset))
+        return status
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            logger.warning(f"Error releasing upload session lock: {e}")
+
+
+def query_upload_session(user_id: str, upload_id: str):
+    """Ask Google how many bytes it has (authoritative after a dropped connection) and return the status."""
+    session = _load_session(user_id, upload_id)
+    if "file" in session:
+        return _session_status(upload_id, session)
+
+    response = scheduled_request(
+        http_session, "PUT", session["session_uri"], user_id, headers={"Content-Range": f"bytes */{session['size']}"}
+    )
+    return _apply_google_response(upload_id, session, response)
+
+
+def finalize_upload_session(db: Session, user_id: str, upload_id: str):
+    """Once every byte is in: make the file view-only, drop the session and return the usual upload links."""
+    session = _load_session(user_id, upload_id)
+    if "file" not in session:
+        status = query_upload_session(user_id, upload_id)
+        if not status["complete"]:
+            raise HTTPException(status_code=409, detail=f"Upload incomplete: {status['offset']} of {status['size']} bytes received")
+        session = _load_session(user_id, upload_id)
+
+    uploaded_file = json.loads(session["file"])
+    drive_service = get_drive_service(db, user_id)
+    try:
+        drive_service.permissions().create(fileId=uploaded_file["id"], body=VIEW_ONLY_PERMISSION).execute()
+    except HttpError as error:
+        raise drive_api_error(error)
+    redis_client.delete(_session_key(upload_id))
+    return uploaded_file_links(uploaded_file, session["file_name"])
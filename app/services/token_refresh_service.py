@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from app.database import SessionLocal
+from app.models.user_token import UserToken
+from app.redis_client import redis_client
+from app.repositories.user_repo import refresh_access_token
+from app.concurrency import run_blocking
+from app.metrics import Counter
+from app.config import (
+    TOKEN_REFRESH_INTERVAL, TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_LOCK_TTL, TOKEN_REFRESH_BATCH_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REFRESHES = Counter("token_refreshes_total", "OAuth access token refreshes by trigger and outcome", labels=("trigger", "result"))
+
+
+def refresh_user_token(db: Session, user_id: str, trigger: str = "inline", wait: bool = True):
+    """
+    Refresh a user's access token at most once across all workers and return the updated UserToken row.
+    The worker holding the Redis lock calls Google; everyone else waits for its result in the database,
+    or with `wait=False` gets None straight away (someone else is already refreshing).
+    """
+    lock = redis_client.lock(f"token_refresh_lock:{user_id}", timeout=TOKEN_REFRESH_LOCK_TTL)
+    try:
+        acquired = lock.acquire(blocking=False)
+    except Exception as e:
+        logger.error(f"Error acquiring token refresh lock, refreshing without it: {e}")
+        acquired, lock = True, None
+
+    if not acquired:
+        if not wait:
+            TOKEN_REFRESHES.inc(trigger=trigger, result="skipped")
+            return None
+        TOKEN_REFRESHES.inc(trigger=trigger, result="waited")
+        return _wait_for_refresh(db, user_id)
+
+    try:
+        refresh_access_token(db, user_id)
+        TOKEN_REFRESHES.inc(trigger=trigger, result="success")
+        return db.query(UserToken).filter(UserToken.user_id == str(user_id)).first()
+    except Exception:
+        TOKEN_REFRESHES.inc(trigger=trigger, result="failure")
+        raise
+    finally:
+        if lock:
+            try:
+                lock.release()
+            except Exception as e:
+                logger.warning(f"Error releasing token refresh lock: {e}")
+
+
+def credentials_refresh_handler(user_id: str):
+    """
+    google-auth `refresh_handler` for a user's Credentials: an expired or rejected token is refreshed through
+    refresh_user_token (one refresh across workers, persisted), so the refresh token never leaves MySQL.
+    """
+    def refresh(request, scopes=None):
+        db = SessionLocal()
+        try:
+            user_token = refresh_user_token(db, user_id)
+            return user_token.access_token, user_token.expires_at
+        finally:
+            db.close()
+    return refresh
+
+
+def _wait_for_refresh(db: Session, user_id: str):
+    """Poll until another worker's refresh lands (fresh expiry) or the lock would have expired."""
+    deadline = time.monotonic() + TOKEN_REFRESH_LOCK_TTL
+    fresh_after = datetime.utcnow() + timedelta(seconds=TOKEN_REFRESH_MARGIN)
+    while time.monotonic() < deadline:
+        db.expire_all()
+        user_token = db.query(UserToken).filter(UserToken.user_id == str(user_id)).first()
+        if not user_token:
+            raise HTTPException(status_code=401, detail="User not authenticated")
+        if user_token.expires_at and user_token.expires_at > fresh_after:
+            return user_token
+        time.sleep(0.25)
+    raise HTTPException(status_code=503, detail="Timed out waiting for token refresh")
+
+
+def refresh_expiring_tokens():
+    """
+    Refresh every token that expires within TOKEN_REFRESH_MARGIN (or whose expiry is unknown).
+    Users another worker is already refreshing are skipped, and one user's failure never stops the batch.
+    """
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() + timedelta(seconds=TOKEN_REFRESH_MARGIN)
+        rows = (
+            db.query(UserToken.user_id)
+            .filter(UserToken.refresh_token.isnot(None))
+            .filter(or_(UserToken.expires_at.is_(None), UserToken.expires_at <= cutoff))
+            .order_by(UserToken.expires_at)
+            .limit(TOKEN_REFRESH_BATCH_SIZE)
+            .all()
+        )
+        for (user_id,) in rows:
+            try:
+                refresh_user_token(db, user_id, trigger="background", wait=False)
+            except HTTPException as e:
+                logger.warning(f"Background token refresh failed for user {user_id}: {e.detail}")
+            except Exception as e:
+                db.rollback()  # ✅ Keep the session usable for the rest of the batch
+                logger.error(f"Background token refresh failed for user {user_id}: {e}")
+        return len(rows)
+    finally:
+        db.close()
+
+
+async def token_refresh_loop():
+    """Background task: refresh tokens shortly before they expire so requests never refresh inline."""
+    while True:
+        try:
+            await run_blocking(refresh_expiring_tokens)
+        except Exception as e:
+            logger.error(f"Token refresh pass failed: {e}")
+        await asyncio.sleep(TOKEN_REFRESH_INTERVAL)
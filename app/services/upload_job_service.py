@@ -0,0 +1,122 @@
+import uuid
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from googleapiclient.errors import HttpError
+from app.redis_client import redis_client
+from app.scheduler import outbound_priority, BULK
+from app.services.drive_service import (
+    get_drive_service, stream_upload, detach_spool, uploaded_file_links, VIEW_ONLY_PERMISSION
+)
+from app.metrics import Gauge
+from app.config import UPLOAD_JOB_WORKERS, UPLOAD_JOB_TTL
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Background uploads: the request only spools the file; a worker pool sends it to Drive.
+# Job state lives in Redis (hash "upload_job:{id}") so any worker process can report it.
+# A job running when its process dies stays in its last stage until UPLOAD_JOB_TTL expires.
+
+UPLOAD_JOBS_ACTIVE = Gauge("drive_upload_jobs_active", "Background upload jobs queued or running in this process")
+
+_job_executor = ThreadPoolExecutor(max_workers=UPLOAD_JOB_WORKERS, thread_name_prefix="upload-job")
+
+
+def _job_key(job_id: str) -> str:
+    return f"upload_job:{job_id}"
+
+
+def _update_job(job_id: str, **fields):
+    """Write job fields and refresh the TTL in one round trip; status updates never fail the upload."""
+    fields["updated_at"] = time.time()
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(_job_key(job_id), mapping={key: value for key, value in fields.items() if value is not None})
+        pipe.expire(_job_key(job_id), UPLOAD_JOB_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Error updating upload job {job_id}: {e}")
+
+
+def _run_upload_job(job_id: str, drive_service, spool, file_name: str, content_type: str):
+    try:
+        _update_job(job_id, stage="uploading")
+        with outbound_priority(BULK):
+            uploaded_file = stream_upload(
+                drive_service, spool, file_name, content_type,
+                on_progress=lambda sent, total: _update_job(job_id, bytes_sent=sent, bytes_total=total),
+            )
+
+            _update_job(job_id, stage="setting_permissions")
+            drive_service.permissions().create(fileId=uploaded_file["id"], body=VIEW_ONLY_PERMISSION).execute()
+
+        _update_job(job_id, stage="done", result=json.dumps(uploaded_file_links(uploaded_file, file_name)))
+    except HttpError as error:
+        _update_job(job_id, stage="failed", error=f"Google Drive API error: {error}")
+    except Exception as e:
+        logger.error(f"Upload job {job_id} failed: {e}")
+        _update_job(job_id, stage="failed", error=str(e))
+    finally:
+        spool.close()
+        UPLOAD_JOBS_ACTIVE.dec()
+
+
+def submit_upload_job(db: Session, user_id: str, file: UploadFile):
+    """
+    Queue an upload of an already spooled request file and answer 202 with the job id.
+    Authentication is checked before queueing so the client gets a 401 immediately, not a failed job.
+    """
+    drive_service = get_drive_service(db, user_id)
+
+    job_id = uuid.uuid4().hex
+    spool = detach_spool(file)
+    spool.seek(0, 2)
+    bytes_total = spool.tell()
+    spool.seek(0)
+
+    try:
+        redis_client.pipeline(transaction=False).hset(_job_key(job_id), mapping={
+            "user_id": str(user_id),
+            "file_name": file.filename,
+            "stage": "queued",
+            "bytes_sent": 0,
+            "bytes_total": bytes_total,
+            "created_at": time.time(),
+            "updated_at": time.time(),
+        }).expire(_job_key(job_id), UPLOAD_JOB_TTL).execute()
+    except Exception as e:
+        spool.close()
+        logger.error(f"Error creating upload job: {e}")
+        raise HTTPException(status_code=503, detail="Background uploads are unavailable")
+
+    UPLOAD_JOBS_ACTIVE.inc()
+    _job_executor.submit(_run_upload_job, job_id, drive_service, spool, file.filename, file.content_type)
+
+    status_url = f"/drive/jobs/{job_id}"
+    return JSONResponse(status_code=202, content={"jobId": job_id, "statusUrl": status_url}, headers={"Location": status_url})
+
+
+def get_upload_job(user_id: str, job_id: str):
+    """Report a job's stage, progress and (once done) the file links; only to the user who started it."""
+    try:
+        job = redis_client.hgetall(_job_key(job_id))
+    except Exception as e:
+        logger.error(f"Error reading upload job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail="Job status is unavailable")
+
+    if not job or job.get("user_id") != str(user_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "jobId": job_id,
+        "fileName": job.get("file_name"),
+        "stage": job.get("stage"),
+        "bytesSent": int(job.get("bytes_sent", 0)),
+        "bytesTotal": int(job.get("bytes_total", 0)),
+        "result": json.loads(job["result"]) if job.get("result") else None,
+        "error": job.get("error"),
+    }
@@ -0,0 +1,205 @@
+import os
+import logging
+import tempfile
+import threading
+from app.metrics import Counter, Gauge
+from app.config import DRIVE_SHARED_DOWNLOAD_MAX_BYTES, DRIVE_SHARED_DOWNLOAD_DISK_BYTES, DRIVE_SHARED_DOWNLOAD_MAX_LEAD
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Request coalescing: identical Drive calls that are in flight at the same time share one upstream call.
+# Keys always include the user, so a result is only ever shared between requests of the same user.
+
+COALESCED_CALLS = Counter(
+    "drive_coalesced_calls_total", "Drive calls that made the upstream request (leader), joined one in flight (shared) or were too large to share (unshared)",
+    labels=("group", "result"),
+)
+SHARED_STREAM_READERS = Gauge("drive_shared_stream_readers", "Clients reading a shared upstream download")
+
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run `fn` once per key at a time; callers arriving while it runs wait and get the same result (or exception).
+    Results are shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED_CALLS.inc(group=self.group, result="shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        COALESCED_CALLS.inc(group=self.group, result="leader")
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class SharedStream:
+    """
+    One upstream chunk iterator fanned out to any number of readers.
+    There is no pump: whichever reader needs bytes nobody has fetched yet pulls the next upstream chunk,
+    so a lone reader streams at its own pace exactly like an unshared download. Chunks are appended to an
+    anonymous temp file that every reader follows from byte 0 with pread, and the fastest reader waits
+    once it is DRIVE_SHARED_DOWNLOAD_MAX_LEAD bytes ahead of the slowest. The upstream call is closed
+    once every reader has gone.
+    """
+
+    def __init__(self, chunks, on_finish):
+        self._chunks = chunks
+        self._on_finish = on_finish
+        self._file = tempfile.TemporaryFile()
+        self._condition = threading.Condition()
+        self._positions = {}  # reader -> bytes it has read
+        self._written = 0
+        self._fetching = False
+        self._finished = False
+        self._error = None
+
+    def attach(self):
+        """Register a reader and return its handle; None once the stream is being torn down."""
+        with self._condition:
+            if self._file.closed or self._error is not None:
+                return None
+            reader = object()
+            self._positions[reader] = 0
+        SHARED_STREAM_READERS.inc()
+        return reader
+
+    def _fetch(self):
+        """Pull one upstream chunk into the file; returns True when the upstream body is complete."""
+        chunk, error = None, None
+        try:
+            chunk = next(self._chunks, None)
+            if chunk:
+                self._file.write(chunk)
+                self._file.flush()
+        except Exception as e:
+            error = e
+        with self._condition:
+            self._fetching = False
+            if error is not None:
+                self._error = error
+            elif chunk is not None:
+                self._written += len(chunk)
+            self._finished = error is not None or chunk is None
+            self._condition.notify_all()
+        return self._finished
+
+    def read(self, reader):
+        """Yield the whole upstream body; upstream errors are re-raised in every reader."""
+        position = 0
+        try:
+            while True:
+                fetch = False
+                with self._condition:
+                    while True:
+                        if self._error is not None:
+                            raise self._error
+                        if position < self._written:
+                            available = self._written - position
+                            break
+                        if self._finished:
+                            return
+                        slowest = min(self._positions.values())
+                        if not self._fetching and self._written - slowest < DRIVE_SHARED_DOWNLOAD_MAX_LEAD:
+                            self._fetching = fetch = True
+                            break
+                        self._condition.wait()
+
+                if fetch:
+                    if self._fetch():
+                        self._on_finish(self)
+                    continue
+
+                data = os.pread(self._file.fileno(), min(available, READ_CHUNK_SIZE), position)
+                position += len(data)
+                with self._condition:
+                    self._positions[reader] = position
+                    self._condition.notify_all()  # A reader held back by the lead limit may go on
+                yield data
+        finally:
+            SHARED_STREAM_READERS.dec()
+            with self._condition:
+                del self._positions[reader]
+                last = not self._positions
+                if last:
+                    self._file.close()
+                self._condition.notify_all()
+            if last:
+                close = getattr(self._chunks, "close", None)
+                if close:
+                    close()
+                self._on_finish(self)
+
+
+class SharedStreams:
+    """
+    Registry of in-flight SharedStreams: a download joins the identical one already running, or starts it.
+    Only downloads that fit DRIVE_SHARED_DOWNLOAD_MAX_BYTES (exports, whose size is unknown, are capped at
+    10 MB by Google) are shared, and only while all shared streams together stay within
+    DRIVE_SHARED_DOWNLOAD_DISK_BYTES; anything else streams straight from upstream.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._streams = {}
+        self._reserved = {}  # stream -> bytes of disk it may use
+        self._lock = threading.Lock()
+
+    def _finish(self, key, stream: SharedStream):
+        with self._lock:
+            if self._streams.get(key) is stream:
+                del self._streams[key]
+            self._reserved.pop(stream, None)
+
+    def open(self, key, make_chunks, size: int = None):
+        """Chunk iterator for `key`, sharing the upstream body with any identical download in flight."""
+        reservation = DRIVE_SHARED_DOWNLOAD_MAX_BYTES if size is None else size
+        with self._lock:
+            stream = self._streams.get(key)
+            reader = stream.attach() if stream is not None else None
+            if reader is not None:
+                COALESCED_CALLS.inc(group=self.group, result="shared")
+                return stream.read(reader)
+
+            if reservation > DRIVE_SHARED_DOWNLOAD_MAX_BYTES or \
+                    sum(self._reserved.values()) + reservation > DRIVE_SHARED_DOWNLOAD_DISK_BYTES:
+                COALESCED_CALLS.inc(group=self.group, result="unshared")
+                return make_chunks()
+
+            stream = SharedStream(make_chunks(), lambda finished: self._finish(key, finished))
+            reader = stream.attach()
+            self._streams[key] = stream
+            self._reserved[stream] = reservation
+        COALESCED_CALLS.inc(group=self.group, result="leader")
+        return stream.read(reader)
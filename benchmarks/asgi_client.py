@@ -0,0 +1,45 @@
+"""Tiny in-process ASGI client used by the benchmarks (no network, no extra dependencies)."""
+import asyncio
+from urllib.parse import urlencode
+
+
+async def asgi_request(app, method: str, path: str, params: dict = None, headers: dict = None, body: bytes = b""):
+    """Send one HTTP request straight into an ASGI app and return (status, headers, body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": urlencode(params or {}, doseq=True).encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    request_sent = False
+    response_complete = asyncio.Event()
+    response = {"status": None, "headers": [], "body": bytearray()}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Only report a disconnect once the response is done, or streaming responses get cancelled
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = [(k.decode(), v.decode()) for k, v in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await app(scope, receive, send)
+    return response["status"], dict(response["headers"]), bytes(response["body"])
@@ -0,0 +1,69 @@
+"""
+Event-loop blocking benchmark.
+
+Serves /drive/files through the real router while the Drive call is replaced by a
+blocking sleep (a slow upstream). Compares handlers that call the sync service inline
+against handlers that offload it with run_blocking, at increasing concurrency.
+
+    python -m benchmarks.bench_event_loop --latency 0.2 --requests 64
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI
+import app.controllers.drive_controller as drive_controller
+from app.database import get_db
+from benchmarks.asgi_client import asgi_request
+
+
+def build_app(latency: float):
+    def slow_list_drive_files(db, user_id, page_token=None, cursor=None, page=None):
+        time.sleep(latency)  # Simulated slow Google round trip
+        return {"files": [], "nextPageToken": None}
+
+    drive_controller.list_drive_files = slow_list_drive_files
+    app = FastAPI()
+    app.include_router(drive_controller.router)
+    app.dependency_overrides[get_db] = lambda: None
+    return app
+
+
+async def run_inline(func, *args, **kwargs):
+    """Old behaviour: the blocking call runs on the event loop thread."""
+    return func(*args, **kwargs)
+
+
+async def measure(app, concurrency: int, total: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            status, _, _ = await asgi_request(app, "GET", "/drive/files", headers={"User-ID": "1"})
+            assert status == 200, status
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+async def main(latency: float, total: int, levels):
+    app = build_app(latency)
+    offload = drive_controller.run_blocking
+
+    print(f"upstream latency {latency * 1000:.0f} ms, {total} requests per run")
+    print(f"{'concurrency':>11} {'inline req/s':>13} {'offloaded req/s':>16}")
+    for concurrency in levels:
+        drive_controller.run_blocking = run_inline
+        inline = await measure(app, concurrency, total)
+        drive_controller.run_blocking = offload
+        offloaded = await measure(app, concurrency, total)
+        print(f"{concurrency:>11} {inline:>13.1f} {offloaded:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated upstream latency in seconds")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.requests, args.concurrency))
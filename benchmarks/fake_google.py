@@ -0,0 +1,338 @@
+"""
+In-process fake of the Google Drive v3 and OAuth token endpoints used by this service.
+
+Implements files.list/get/create/export/get_media (with Range), resumable uploads,
+permissions.create (plain and via /batch), changes.getStartPageToken/list, about,
+token refresh and revocation. Every request can be delayed (`latency`) or failed
+with a 500 / 429 (`error_rate`, `rate_limit_rate`) to exercise error paths.
+
+    python -m benchmarks.fake_google --port 8765 --latency-ms 40
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+GOOGLE_APPS_EXPORTS = {
+    "application/vnd.google-apps.document",
+    "application/vnd.google-apps.spreadsheet",
+    "application/vnd.google-apps.presentation",
+}
+
+
+class FakeDrive:
+    """Thread-safe in-memory Drive: file metadata, content and pending resumable sessions."""
+
+    def __init__(self, files: int = 200, file_size: int = 256 * 1024, seed: int = 7):
+        self.lock = threading.Lock()
+        self.files = {}
+        self.order = []
+        self.sessions = {}
+        self.change_counter = 1000
+        rng = random.Random(seed)
+        for index in range(files):
+            google_doc = index % 5 == 0
+            self.add_file(
+                name=f"file-{index:05d}{'' if google_doc else '.bin'}",
+                mime_type="application/vnd.google-apps.document" if google_doc else "application/octet-stream",
+                content=b"" if google_doc else rng.randbytes(file_size),
+            )
+
+    def add_file(self, name: str, mime_type: str, content: bytes = b"", parents=None):
+        file_id = uuid.uuid4().hex[:20]
+        metadata = {
+            "id": file_id,
+            "name": name,
+            "mimeType": mime_type,
+            "webViewLink": f"https://drive.google.com/file/d/{file_id}/view",
+            "modifiedTime": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "parents": parents or ["root"],
+            "version": "1",
+        }
+        if mime_type not in GOOGLE_APPS_EXPORTS and not mime_type.startswith("application/vnd.google-apps."):
+            metadata["size"] = str(len(content))
+            metadata["md5Checksum"] = hashlib.md5(content).hexdigest()
+        with self.lock:
+            self.files[file_id] = (metadata, content)
+            self.order.append(file_id)
+        return metadata
+
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like googleapis.com
+
+    server_version = "FakeGoogle/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    # 🔹 Helpers
+
+    @property
+    def drive(self) -> FakeDrive:
+        return self.server.drive
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status: int, payload: dict, headers: dict = None):
+        self._send(status, json.dumps(payload).encode(), headers=headers)
+
+    def _error(self, status: int, reason: str, headers: dict = None):
+        self._json(status, {"error": {"code": status, "message": reason, "errors": [{"reason": reason}]}}, headers)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _inject(self) -> bool:
+        """Apply configured latency and random failures; returns True when a failure was sent."""
+        config = self.server.config
+        if config["latency"]:
+            time.sleep(config["latency"] * random.uniform(0.8, 1.2))
+        roll = random.random()
+        if roll < config["error_rate"]:
+            self._body()
+            self._error(500, "backendError")
+            return True
+        if roll < config["error_rate"] + config["rate_limit_rate"]:
+            self._body()
+            self._error(429, "userRateLimitExceeded", headers={"Retry-After": "1"})
+            return True
+        return False
+
+    def _file_or_404(self, file_id: str):
+        with self.drive.lock:
+            entry = self.drive.files.get(file_id)
+        if not entry:
+            self._error(404, "notFound")
+        return entry
+
+    # 🔹 Routing
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def _route(self, method: str):
+        url = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path
+        if self._inject():
+            return
+
+        routes = [
+            ("POST", r"/token", self.token),
+            ("POST", r"/revoke", self.revoke),
+            ("GET", r"/drive/v3/about", self.about),
+            ("GET", r"/drive/v3/files", self.files_list),
+            ("POST", r"/drive/v3/files", self.files_create),
+            ("GET", r"/drive/v3/files/([^/]+)/export", self.files_export),
+            ("GET", r"/drive/v3/files/([^/]+)", self.files_get),
+            ("POST", r"/drive/v3/files/([^/]+)/permissions", self.permissions_create),
+            ("GET", r"/drive/v3/changes/startPageToken", self.changes_start_token),
+            ("GET", r"/drive/v3/changes", self.changes_list),
+            ("POST", r"/upload/drive/v3/files", self.upload_start),
+            ("PUT", r"/upload/session/([^/]+)", self.upload_chunk),
+            ("POST", r"/batch/drive/v3", self.batch),
+        ]
+        for route_method, pattern, handler in routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return handler(*match.groups())
+        self._body()
+        self._error(404, "notFound")
+
+    # 🔹 OAuth
+
+    def token(self):
+        self._body()
+        self._json(200, {"access_token": f"fake-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"})
+
+    def revoke(self):
+        self._body()
+        self._json(200, {})
+
+    def about(self):
+        self._json(200, {"user": {"displayName": "Benchmark User", "emailAddress": "bench@example.com"}})
+
+    # 🔹 Files
+
+    def files_list(self):
+        page_size = min(int(self.query.get("pageSize", 100)), 1000)
+        offset = int(self.query.get("pageToken") or 0)
+        parent = re.search(r"'([^']+)' in parents", self.query.get("q", ""))
+        with self.drive.lock:
+            entries = [self.drive.files[file_id][0] for file_id in self.drive.order]
+        if parent:
+            entries = [entry for entry in entries if parent.group(1) in entry.get("parents", [])]
+        page = entries[offset:offset + page_size]
+        projection = re.search(r"files\(([^)]*(?:\([^)]*\)[^)]*)*)\)", self.query.get("fields", ""))
+        if projection:
+            keep = {re.split(r"[(\s]", field.strip())[0] for field in re.sub(r"\([^)]*\)", "", projection.group(1)).split(",")}
+            page = [{key: value for key, value in entry.items() if key in keep} for entry in page]
+        payload = {"files": page}
+        if offset + page_size < len(entries):
+            payload["nextPageToken"] = str(offset + page_size)
+        self._json(200, payload)
+
+    def files_get(self, file_id):
+        if file_id == "root":
+            # My Drive itself; files without parents live directly in it
+            return self._json(200, {"id": "root", "name": "My Drive", "mimeType": "application/vnd.google-apps.folder"})
+        entry = self._file_or_404(file_id)
+        if not entry:
+            return
+        metadata, content = entry
+        if self.query.get("alt") != "media":
+            return self._json(200, metadata)
+
+        range_header = self.headers.get("Range", "")
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header)
+        if not match:
+            return self._send(200, content, metadata["mimeType"])
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(content) - 1, len(content) - 1)
+        if start >= len(content):
+            return self._send(416, b"", headers={"Content-Range": f"bytes */{len(content)}"})
+        self._send(206, content[start:end + 1], metadata["mimeType"], {"Content-Range": f"bytes {start}-{end}/{len(content)}"})
+
+    def files_export(self, file_id):
+        entry = self._file_or_404(file_id)
+        if not entry:
+            return
+        metadata, _ = entry
+        # Deterministic pseudo-export, a few hundred KiB like a small docx
+        body = hashlib.sha256(file_id.encode()).digest() * (300 * 1024 // 32)
+        self._send(200, body, self.query.get("mimeType", "application/octet-stream"))
+
+    def files_create(self):
+        body = json.loads(self._body() or b"{}")
+        metadata = self.drive.add_file(body.get("name", "Untitled"), body.get("mimeType", "application/octet-stream"), parents=body.get("parents"))
+        self._json(200, metadata)
+
+    def permissions_create(self, file_id):
+        self._body()
+        if not self._file_or_404(file_id):
+            return
+        self._json(200, {"id": uuid.uuid4().hex[:12], "type": "anyone", "role": "reader"})
+
+    # 🔹 Changes
+
+    def changes_start_token(self):
+        self._json(200, {"startPageToken": str(self.drive.change_counter)})
+
+    def changes_list(self):
+        self._json(200, {"changes": [], "newStartPageToken": str(self.drive.change_counter)})
+
+    # 🔹 Resumable uploads
+
+    def upload_start(self):
+        metadata = json.loads(self._body() or b"{}")
+        session_id = uuid.uuid4().hex
+        with self.drive.lock:
+            self.drive.sessions[session_id] = {
+                "metadata": metadata,
+                "size": int(self.headers.get("X-Upload-Content-Length") or -1),
+                "content": bytearray(),
+            }
+        host = self.headers.get("Host")
+        self._send(200, b"", headers={"Location": f"http://{host}/upload/session/{session_id}"})
+
+    def upload_chunk(self, session_id):
+        body = self._body()
+        with self.drive.lock:
+            session = self.drive.sessions.get(session_id)
+        if not session:
+            return self._error(404, "notFound")
+
+        match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", self.headers.get("Content-Range", ""))
+        status_only = re.fullmatch(r"bytes \*/(\d+|\*)", self.headers.get("Content-Range", ""))
+        if match:
+            if int(match.group(1)) != len(session["content"]):
+                return self._error(400, "badRequest")
+            session["content"] += body
+            if match.group(3) != "*":
+                session["size"] = int(match.group(3))
+        elif not status_only:
+            session["content"] += body
+            session["size"] = len(session["content"])
+
+        received = len(session["content"])
+        if received < session["size"] or session["size"] < 0:
+            headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+            return self._send(308, b"", headers=headers)
+
+        with self.drive.lock:
+            self.drive.sessions.pop(session_id, None)
+        content = bytes(session["content"])
+        metadata = session["metadata"]
+        mime_type = metadata.get("mimeType") or self.headers.get("Content-Type", "application/octet-stream")
+        created = self.drive.add_file(metadata.get("name", "upload"), mime_type, content, metadata.get("parents"))
+        self._json(200, created)
+
+    # 🔹 Batch
+
+    def batch(self):
+        body = self._body().decode()
+        boundary = re.search(r'boundary="?([^";]+)"?', self.headers.get("Content-Type", "")).group(1)
+        response_boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in body.split(f"--{boundary}")[1:-1]:
+            content_id = re.search(r"Content-ID: <(.+?)>", part, re.S).group(1)
+            parts.append(
+                f"--{response_boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n"
+                f"{json.dumps({'id': uuid.uuid4().hex[:12], 'type': 'anyone', 'role': 'reader'})}\r\n"
+            )
+        payload = "".join(parts) + f"--{response_boundary}--\r\n"
+        self._send(200, payload.encode(), f"multipart/mixed; boundary={response_boundary}")
+
+
+def start_fake_google(port: int = 0, latency: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                      files: int = 200, file_size: int = 256 * 1024):
+    """Start the fake server on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeGoogleHandler)
+    server.daemon_threads = True
+    server.drive = FakeDrive(files=files, file_size=file_size)
+    server.config = {"latency": latency, "error_rate": error_rate, "rate_limit_rate": rate_limit_rate}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=256 * 1024)
+    args = parser.parse_args()
+    server, url = start_fake_google(args.port, args.latency_ms / 1000, args.error_rate, args.rate_limit_rate, args.files, args.file_size)
+    print(f"Fake Google listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
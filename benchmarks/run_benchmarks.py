@@ -0,0 +1,281 @@
+"""
+Benchmark the API against a local fake Google Drive (no real Google traffic).
+
+Starts benchmarks.fake_google in a child process, points the app at it through
+GOOGLE_API_ROOT_URL / GOOGLE_TOKEN_URI / GOOGLE_REVOKE_URI, serves the real routers
+in-process over ASGI with a SQLite session, and drives each scenario concurrently.
+Each scenario runs in a fresh child process, so its peak RSS is its own and not left over
+from an earlier scenario. Reports throughput, p50/p95/p99 latency, error count and peak RSS
+per scenario, saves the results as JSON and optionally compares them with a previous run.
+
+    python -m benchmarks.run_benchmarks --requests 200 --concurrency 32 --latency-ms 40
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SCENARIOS = ("list_files", "upload", "download", "download_range", "create_file", "auth_status", "mixed")
+
+
+def _serve_fake_google(port_queue, latency, error_rate, rate_limit_rate, files, file_size):
+    from benchmarks.fake_google import start_fake_google
+    server, _ = start_fake_google(0, latency, error_rate, rate_limit_rate, files, file_size)
+    port_queue.put(server.server_port)
+    threading.Event().wait()
+
+
+def _peak_rss_bytes() -> int:
+    """Peak RSS of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _multipart(file_name: str, content: bytes):
+    boundary = "benchmarkboundary"
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def build_app(db_path: str, users: int):
+    """Real routers, SQLite instead of MySQL, users 1..N seeded with tokens."""
+    from fastapi import FastAPI
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base, get_db
+    from app.models.user_token import UserToken
+    from app.controllers.auth_controller import router as auth_router
+    from app.controllers.drive_controller import router as drive_router
+    from app.controllers.metrics_controller import router as metrics_router
+    from app.middleware import MetricsMiddleware
+
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        for user_id in range(1, users + 1):
+            db.merge(UserToken(
+                user_id=str(user_id), access_token=f"bench-token-{user_id}", refresh_token="bench-refresh",
+                expires_at=datetime.utcnow() + timedelta(hours=1),
+            ))
+        db.commit()
+
+    def get_sqlite_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(auth_router)
+    app.include_router(drive_router)
+    app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+    app.dependency_overrides[get_db] = get_sqlite_db
+    return app
+
+
+def build_scenarios(file_ids, export_ids, upload_size: int):
+    upload_body, upload_type = _multipart("bench.bin", os.urandom(upload_size))
+
+    def list_files(user):
+        return "GET", "/drive/files", {}, {}, b""
+
+    def upload(user):
+        return "POST", "/drive/upload", {}, {"Content-Type": upload_type}, upload_body
+
+    def download(user):
+        file_id = random.choice(file_ids + export_ids)
+        return "GET", "/drive/download-file", {"file_id": file_id}, {}, b""
+
+    def download_range(user):
+        return "GET", "/drive/download-file", {"file_id": random.choice(file_ids)}, {"Range": "bytes=0-65535"}, b""
+
+    def create_file(user):
+        return "POST", "/drive/create-file", {"title": "Bench", "file_type": "doc"}, {}, b""
+
+    def auth_status(user):
+        return "GET", "/auth/status", {}, {}, b""
+
+    scenarios = {
+        "list_files": list_files, "upload": upload, "download": download, "download_range": download_range,
+        "create_file": create_file, "auth_status": auth_status,
+    }
+
+    def mixed(user):
+        return random.choice(list(scenarios.values()))(user)
+
+    scenarios["mixed"] = mixed
+    return scenarios
+
+
+async def run_scenario(app, make_request, total: int, concurrency: int, users: int):
+    from benchmarks.asgi_client import asgi_request
+
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        nonlocal errors
+        user = index % users + 1
+        method, path, params, headers, body = make_request(user)
+        async with semaphore:
+            started = time.perf_counter()
+            status, _, _ = await asgi_request(app, method, path, params, dict(headers, **{"User-ID": str(user)}), body)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+def _scenario_process(result_queue, name: str, db_path: str, file_ids, export_ids, args):
+    """Child process entry point: build the app, run one scenario and report it with this process's peak RSS."""
+    logging.disable(logging.ERROR)
+    app = build_app(db_path, args.users)
+    scenarios = build_scenarios(file_ids, export_ids, args.upload_size)
+    result = asyncio.run(run_scenario(app, scenarios[name], args.requests, args.concurrency, args.users))
+    result["peak_rss_mb"] = round(_peak_rss_bytes() / (1024 * 1024), 1)
+    result_queue.put(result)
+
+
+def run_scenario_isolated(name: str, db_path: str, file_ids, export_ids, args) -> dict:
+    """Run one scenario in a freshly spawned process (the environment is inherited, memory is not)."""
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(target=_scenario_process, args=(result_queue, name, db_path, file_ids, export_ids, args))
+    process.start()
+    try:
+        return result_queue.get()
+    finally:
+        process.join()
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print per-scenario deltas against a baseline; returns True when something regressed beyond `threshold`."""
+    regressed = False
+    print(f"\nComparison against baseline (regression threshold {threshold:.0%}):")
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        throughput_delta = result["throughput_rps"] / before["throughput_rps"] - 1 if before["throughput_rps"] else 0
+        p95_delta = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0
+        flag = ""
+        if throughput_delta < -threshold or p95_delta > threshold:
+            flag, regressed = "  <-- REGRESSION", True
+        print(f"  {name:<15} throughput {throughput_delta:+7.1%}   p95 {p95_delta:+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20, help="Injected fake Google latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake Google calls failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of fake Google calls failing with 429")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=512 * 1024)
+    parser.add_argument("--upload-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"))
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change treated as a regression")
+    args = parser.parse_args()
+
+    port_queue = multiprocessing.Queue()
+    fake = multiprocessing.Process(
+        target=_serve_fake_google,
+        args=(port_queue, args.latency_ms / 1000, args.error_rate, args.rate_limit_rate, args.files, args.file_size),
+        daemon=True,
+    )
+    fake.start()
+    base_url = f"http://127.0.0.1:{port_queue.get(timeout=30)}/"
+
+    # Must be set before the app modules read their config
+    os.environ.update({
+        "GOOGLE_API_ROOT_URL": base_url,
+        "GOOGLE_TOKEN_URI": f"{base_url}token",
+        "GOOGLE_REVOKE_URI": f"{base_url}revoke",
+        "REDIS_URL": args.redis_url,
+        "TOKEN_REFRESH_ENABLED": "False",
+    })
+    logging.disable(logging.ERROR)  # An absent Redis is expected; caches fall back silently
+
+    import requests
+    listing = requests.get(f"{base_url}drive/v3/files", params={"pageSize": 1000}).json()["files"]
+    file_ids = [f["id"] for f in listing if "size" in f]
+    export_ids = [f["id"] for f in listing if "size" not in f]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "meta": {
+                "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                **{key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            },
+            "scenarios": {},
+        }
+
+        print(f"{'scenario':<15} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'peak RSS MB':>12}")
+        for name in args.scenarios:
+            result = run_scenario_isolated(name, os.path.join(tmp, f"{name}.db"), file_ids, export_ids, args)
+            results["scenarios"][name] = result
+            print(
+                f"{name:<15} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['p99_ms']:>9.1f} {result['errors']:>7} {result['peak_rss_mb']:>12.1f}"
+            )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    fake.terminate()
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,44 @@
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI,HTTPException
 from fastapi.responses import JSONResponse
+from googleapiclient.errors import HttpError
 
 from fastapi.middleware.cors import CORSMiddleware
 from app.controllers.auth_controller import router as auth_router
 from app.controllers.drive_controller import router as drive_router
-from app.database import engine, Base
+from app.controllers.metrics_controller import router as metrics_router
+from app.database import engine, async_engine, Base
+from app.redis_client import async_redis_client, check_redis
+from app.middleware import MetricsMiddleware
+from app.services.token_refresh_service import token_refresh_loop
+from app.services.drive_service import drive_api_error
+from app.config import TOKEN_REFRESH_ENABLED
 from fastapi.staticfiles import StaticFiles
 import os
 
 # Ensure MySQL tables are created
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers with the app and stop them on shutdown."""
+    await check_redis()
+    background_tasks = []
+    if TOKEN_REFRESH_ENABLED:
+        background_tasks.append(asyncio.create_task(token_refresh_loop()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await async_engine.dispose()
+    await async_redis_client.aclose(close_connection_pool=True)
+
 app = FastAPI(
     title="Google Drive Integration API",
     description="Google Drive authentication, file uploads, and central drive management.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 @app.exception_handler(HTTPException)
@@ -26,8 +49,14 @@ async def custom_http_exception_handler(request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"message": exc.detail},  # Rename 'detail' to 'message'
+        headers=exc.headers,
     )
 
+@app.exception_handler(HttpError)
+async def drive_http_error_handler(request, exc: HttpError):
+    """Drive errors not handled by a service: rate limits surface as 429 + Retry-After instead of a bare 500."""
+    return await custom_http_exception_handler(request, drive_api_error(exc))
+
 # Ensure 'static' directory exists before mounting
 STATIC_DIR = "static"
 if not os.path.exists(STATIC_DIR):
@@ -44,12 +73,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"]
+    expose_headers=["Content-Disposition", "Content-Range", "Accept-Ranges", "Content-Length", "ETag"]
 )
 
+# Request latency / in-flight metrics (outermost, so CORS and error handling are included)
+app.add_middleware(MetricsMiddleware)
+
 # Include Routes
 app.include_router(auth_router)
 app.include_router(drive_router)
+app.include_router(metrics_router)
 
 @app.get("/", tags=["Health Check"])
 async def root():
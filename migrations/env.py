@@ -24,6 +24,8 @@ config.set_main_option("sqlalchemy.url", DATABASE_URL)
 # target_metadata = mymodel.Base.metadata
 from app.database import Base
 from app.models.user_token import UserToken
+from app.models.drive_file import DriveFile, DriveSyncState
+from app.models.drive_tree import DriveTreeNode, DriveTreeCrawl
 
 target_metadata = Base.metadata
 
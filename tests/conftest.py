@@ -0,0 +1,48 @@
+import pytest
+from app import cache
+
+
+class FakeAsyncRedis:
+    """The slice of redis.asyncio.Redis that TwoTierCache uses, kept in a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = (value.encode(), ttl)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def get(self, key):
+        self.commands.append(lambda: self.redis.data.get(key, (None, -2))[0])
+        return self
+
+    def ttl(self, key):
+        self.commands.append(lambda: self.redis.data.get(key, (None, -2))[1])
+        return self
+
+    async def execute(self):
+        return [command() for command in self.commands]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeAsyncRedis()
+    monkeypatch.setattr(cache, "async_redis_client", fake)
+    return fake
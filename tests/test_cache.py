@@ -0,0 +1,36 @@
+import asyncio
+from app.cache import TwoTierCache, MISSING, CACHE_REQUESTS
+
+
+def test_aset_writes_through_both_tiers(redis):
+    tokens = TwoTierCache("test_aset", maxsize=10, local_ttl=30, remote_ttl=300)
+    asyncio.run(tokens.aset("1", {"access_token": "a"}))
+    assert tokens.get_local("1") == {"access_token": "a"}
+    assert redis.data["test_aset:1"][1] == 300
+
+
+def test_aget_falls_back_to_redis_and_fills_the_local_tier(redis):
+    tokens = TwoTierCache("test_aget", maxsize=10, local_ttl=30, remote_ttl=300)
+    redis.data["test_aget:1"] = (b'{"access_token": "a"}', 120)
+    assert asyncio.run(tokens.aget("1")) == {"access_token": "a"}
+    assert tokens.get_local("1") == {"access_token": "a"}
+    assert asyncio.run(tokens.aget("2")) is MISSING
+
+
+def test_aset_with_no_ttl_left_deletes(redis):
+    tokens = TwoTierCache("test_adelete", maxsize=10, local_ttl=30, remote_ttl=300)
+    asyncio.run(tokens.aset("1", "value"))
+    asyncio.run(tokens.aset("1", "value", ttl=0))
+    assert tokens.get_local("1") is MISSING
+    assert "test_adelete:1" not in redis.data
+
+
+def test_get_with_a_different_expected_value_is_a_miss():
+    tokens = TwoTierCache("test_expected", maxsize=10, local_ttl=30, remote_ttl=300)
+    tokens.set_local("1", "old-token")
+    misses = CACHE_REQUESTS.value(cache="test_expected", result="miss")
+    assert tokens.get("1", expected="new-token") is MISSING
+    assert CACHE_REQUESTS.value(cache="test_expected", result="miss") == misses + 1
+    assert CACHE_REQUESTS.value(cache="test_expected", result="hit_local") == 0
+    assert tokens.get("1", expected="old-token") == "old-token"
+    assert CACHE_REQUESTS.value(cache="test_expected", result="hit_local") == 1
@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from app.services import drive_service
+from app.services.drive_service import parse_range_header, etag_matches, file_etag, make_etag, download_file
+
+CONTENT = bytes(range(100))
+METADATA = {"id": "f1", "name": "data.bin", "mimeType": "application/octet-stream", "size": str(len(CONTENT)), "md5Checksum": "abc"}
+_users = itertools.count(1)
+
+
+class FakeMediaRequest:
+    """get_media request whose transport answers `range` headers from CONTENT."""
+
+    uri = "https://www.googleapis.com/drive/v3/files/f1?alt=media"
+    headers = {}
+
+    def __init__(self):
+        self.http = self
+        self.ranges = []
+
+    def request(self, uri, method="GET", headers=None):
+        start, end = (int(part) for part in headers["range"][len("bytes="):].split("-"))
+        self.ranges.append((start, end))
+        return SimpleNamespace(status=206), CONTENT[start:end + 1]
+
+
+class FakeDrive:
+    def __init__(self):
+        self.media = FakeMediaRequest()
+
+    def files(self):
+        return self
+
+    def get(self, **kwargs):
+        return SimpleNamespace(execute=lambda: dict(METADATA))
+
+    def get_media(self, **kwargs):
+        return self.media
+
+
+@pytest.fixture
+def drive(monkeypatch):
+    fake = FakeDrive()
+    monkeypatch.setattr(drive_service, "get_drive_service", lambda db, user_id: fake)
+    return fake
+
+
+def _download(**headers):
+    # A fresh user per call so concurrent-download sharing never links two tests
+    return download_file(None, str(next(_users)), "f1", **headers)
+
+
+def _body(response) -> bytes:
+    async def read():
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=95-500", (95, 99)),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-9", "bytes=0-9,20-29", "bytes=a-b"])
+def test_unsupported_ranges_mean_whole_file(header):
+    assert parse_range_header(header, 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=100-200", "bytes=50-10"])
+def test_unsatisfiable_range_is_416(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range_header(header, 100)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == "bytes */100"
+
+
+def test_etag_matches():
+    etag = make_etag("f1", "abc")
+    assert etag_matches(etag, etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f"W/{etag}", etag)  # If-None-Match uses weak comparison
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+def test_file_etag_follows_content_and_format():
+    assert file_etag(METADATA) == file_etag(dict(METADATA, version="9"))  # md5 decides for binary files
+    assert file_etag(METADATA) != file_etag(dict(METADATA, md5Checksum="def"))
+
+    doc = {"id": "d1", "version": "3", "modifiedTime": "2024-05-01T10:00:00.000Z"}
+    assert file_etag(doc, "application/pdf") != file_etag(doc, "text/plain")
+    assert file_etag(doc, "application/pdf") != file_etag(dict(doc, version="4"), "application/pdf")
+
+
+def test_range_download_is_206(drive):
+    response = _download(range_header="bytes=10-19")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 10-19/100"
+    assert _body(response) == CONTENT[10:20]
+    assert drive.media.ranges == [(10, 19)]
+
+
+def test_unsatisfiable_range_download_is_416(drive):
+    with pytest.raises(HTTPException) as error:
+        _download(range_header="bytes=200-")
+    assert error.value.status_code == 416
+    assert drive.media.ranges == []
+
+
+def test_if_none_match_is_304_without_content(drive):
+    response = _download(if_none_match=file_etag(METADATA))
+    assert response.status_code == 304
+    assert drive.media.ranges == []
+
+
+def test_if_range_with_current_etag_keeps_the_range(drive):
+    response = _download(range_header="bytes=0-4", if_range=file_etag(METADATA))
+    assert response.status_code == 206
+    assert _body(response) == CONTENT[:5]
+
+
+def test_if_range_with_stale_etag_sends_the_whole_file(drive):
+    response = _download(range_header="bytes=0-4", if_range='"stale"')
+    assert response.status_code == 200
+    assert "Content-Range" not in response.headers
+    assert _body(response) == CONTENT
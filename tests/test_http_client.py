@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from app.http_client import GOOGLE_API_SECONDS, GOOGLE_API_ERRORS, timed_media
+from app.services.drive_service import iter_media_range, iter_media_download
+
+CONTENT = bytes(range(256)) * 4
+
+
+def _calls(method: str) -> int:
+    series = GOOGLE_API_SECONDS._values.get((method,))
+    return sum(series[:-1]) if series else 0
+
+
+class FakeTransport:
+    """http for a media request: serves `range` headers from CONTENT, or the scripted status/exception."""
+
+    def __init__(self, status: int = 206, error: Exception = None):
+        self.status = status
+        self.error = error
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        if self.error:
+            raise self.error
+        start, end = (int(part) for part in headers["range"][len("bytes="):].split("-"))
+        content = CONTENT[start:end + 1] if self.status == 206 else b"{}"
+        response = httplib2.Response({"status": self.status, "content-range": f"bytes {start}-{end}/{len(CONTENT)}"})
+        return response, content
+
+
+def _request(method_id: str, transport: FakeTransport):
+    return SimpleNamespace(uri="https://www.googleapis.com/drive/v3/files/f1?alt=media", headers={},
+                           methodId=method_id, http=transport, resumable=None)
+
+
+def test_ranged_download_times_every_chunk(monkeypatch):
+    monkeypatch.setattr("app.services.drive_service.DRIVE_DOWNLOAD_CHUNK_SIZE", 256)
+    before = _calls("test.get_media.ok")
+    body = b"".join(iter_media_range(_request("test.get_media.ok", FakeTransport()), 0, len(CONTENT) - 1))
+    assert body == CONTENT
+    assert _calls("test.get_media.ok") - before == 4
+
+
+def test_export_download_times_every_chunk(monkeypatch):
+    monkeypatch.setattr("app.services.drive_service.DRIVE_DOWNLOAD_CHUNK_SIZE", 512)
+    body = b"".join(iter_media_download(_request("test.export.ok", FakeTransport())))
+    assert body == CONTENT
+    assert _calls("test.export.ok") == 2
+
+
+def test_error_statuses_are_counted():
+    with pytest.raises(HttpError):
+        list(iter_media_range(_request("test.get_media.500", FakeTransport(status=500)), 0, 9))
+    assert GOOGLE_API_ERRORS.value(method="test.get_media.500", status=500) == 1
+    assert _calls("test.get_media.500") == 1
+
+
+def test_transport_errors_are_counted():
+    with pytest.raises(ConnectionError):
+        list(iter_media_range(_request("test.get_media.down", FakeTransport(error=ConnectionError())), 0, 9))
+    assert GOOGLE_API_ERRORS.value(method="test.get_media.down", status="transport") == 1
+
+
+def test_requests_are_wrapped_once():
+    request = _request("test.wrap", FakeTransport())
+    assert timed_media(timed_media(request)).http.http.__class__ is FakeTransport
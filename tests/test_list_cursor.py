@@ -0,0 +1,109 @@
+import pytest
+from fastapi import HTTPException
+from app.config import DRIVE_LIST_CURSOR_HISTORY
+from app.services.list_cursor import encode_cursor, decode_cursor, _b64encode, _b64decode
+from app.services.drive_service import _seek_page
+
+
+class FakeListing:
+    """files().list(...).execute() over `pages` pages whose tokens are "t2", "t3", ..."""
+
+    def __init__(self, pages: int):
+        self.pages = pages
+        self.calls = []
+
+    def files(self):
+        return self
+
+    def list(self, pageToken=None, **kwargs):
+        self.calls.append(pageToken)
+        page = 1 if pageToken is None else int(pageToken[1:])
+        self._next = f"t{page + 1}" if page < self.pages else None
+        return self
+
+    def execute(self):
+        return {"nextPageToken": self._next}
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("1", 3, [None, "t2", "t3"])
+    assert decode_cursor(cursor, "1") == (3, [None, "t2", "t3"], None)
+
+
+def test_cursor_round_trip_with_seek():
+    cursor = encode_cursor("1", 1, [None], seek=7)
+    assert decode_cursor(cursor, "1") == (1, [None], 7)
+
+
+def test_cursor_keeps_only_recent_history():
+    tokens = [None] + [f"t{page}" for page in range(2, DRIVE_LIST_CURSOR_HISTORY + 5)]
+    page, kept, _ = decode_cursor(encode_cursor("1", len(tokens), tokens), "1")
+    assert page == len(tokens)
+    assert kept == tokens[-DRIVE_LIST_CURSOR_HISTORY:]
+
+
+def test_cursor_is_bound_to_its_user():
+    cursor = encode_cursor("1", 2, [None, "t2"])
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "2")
+    assert error.value.status_code == 400
+
+
+def test_tampered_payload_is_rejected():
+    payload, signature = encode_cursor("1", 2, [None, "t2"]).split(".")
+    forged = _b64decode(payload)
+    forged = forged[:-1] + bytes([forged[-1] ^ 1])
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(f"{_b64encode(forged)}.{signature}", "1")
+    assert error.value.status_code == 400
+
+
+def test_swapped_signature_is_rejected():
+    payload, _ = encode_cursor("1", 2, [None, "t2"]).split(".")
+    _, signature = encode_cursor("1", 3, [None, "t2", "t3"]).split(".")
+    with pytest.raises(HTTPException):
+        decode_cursor(f"{payload}.{signature}", "1")
+
+
+@pytest.mark.parametrize("cursor", ["", "garbage", "a.b.c", "!!.??"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "1")
+    assert error.value.status_code == 400
+
+
+def test_signed_but_inconsistent_cursor_is_rejected():
+    # More tokens than pages can't come from a real listing
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor("1", 1, [None, "t2"]), "1")
+
+
+def test_seek_within_history_makes_no_calls():
+    listing = FakeListing(pages=10)
+    assert _seek_page(listing, "1", 4, ["t2", "t3", "t4"], 3) == (3, ["t2", "t3"])
+    assert listing.calls == []
+
+
+def test_seek_forward_walks_page_tokens():
+    listing = FakeListing(pages=10)
+    assert _seek_page(listing, "1", 2, [None, "t2"], 4) == (4, [None, "t2", "t3", "t4"])
+    assert listing.calls == ["t2", "t3"]
+
+
+def test_seek_before_history_replays_from_the_start():
+    listing = FakeListing(pages=10)
+    page, tokens = _seek_page(listing, "1", 8, ["t7", "t8"], 3, max_jump=None)
+    assert (page, tokens) == (3, [None, "t2", "t3"])
+    assert listing.calls == [None, "t2"]
+
+
+def test_seek_jump_is_capped():
+    with pytest.raises(HTTPException) as error:
+        _seek_page(FakeListing(pages=100), "1", 1, [None], 50, max_jump=5)
+    assert error.value.status_code == 400
+
+
+def test_seek_past_the_last_page_is_404():
+    with pytest.raises(HTTPException) as error:
+        _seek_page(FakeListing(pages=3), "1", 1, [None], 5)
+    assert error.value.status_code == 404
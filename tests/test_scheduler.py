@@ -0,0 +1,149 @@
+import json
+import time
+import pytest
+from app import scheduler as scheduler_module
+from app.scheduler import (
+    TokenBucket, OutboundScheduler, rate_limit_reason, retry_delay, send_scheduled, current_priority, outbound_priority,
+    INTERACTIVE, BULK
+)
+from app.config import DRIVE_RETRY_MAX_ATTEMPTS, DRIVE_RETRY_MAX_DELAY
+
+URI = "https://www.googleapis.com/drive/v3/files"
+
+
+def _error(status: int, reason: str) -> bytes:
+    return json.dumps({"error": {"code": status, "errors": [{"reason": reason}]}}).encode()
+
+
+class Upstream:
+    """send() callable replaying scripted (status, content) responses, then 200."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        status, content = self.responses.pop(0) if self.responses else (200, b"{}")
+        return status, {}, content
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """A roomy scheduler and no real backoff sleeps."""
+    fresh = OutboundScheduler(global_qps=1000, user_qps=1000, burst_seconds=1)
+    monkeypatch.setattr(scheduler_module, "scheduler", fresh)
+    monkeypatch.setattr(scheduler_module, "retry_delay", lambda attempt, retry_after=None: 0.0)
+    return fresh
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = bucket.updated
+    bucket.take(), bucket.take()
+    assert bucket.wait_time(now) == pytest.approx(0.1)
+    assert bucket.wait_time(now + 0.1) == 0.0
+    assert bucket.wait_time(now + 10) == 0.0 and bucket.tokens == 2  # Never above capacity
+
+
+def test_blocked_bucket_waits_until_unblocked():
+    bucket = TokenBucket(rate=10, capacity=2)
+    bucket.blocked_until = bucket.updated + 5
+    assert bucket.wait_time(bucket.updated + 1) == pytest.approx(4)
+
+
+def test_user_buckets_are_independent():
+    outbound = OutboundScheduler(global_qps=1000, user_qps=5, burst_seconds=1)
+    started = time.monotonic()
+    for _ in range(5):
+        outbound.acquire("a")
+        outbound.acquire("b")
+    assert time.monotonic() - started < 0.1  # Both users still within their burst
+
+    outbound.acquire("a")  # Sixth call for "a" waits for a refill (1/5 s)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_block_applies_to_user_or_everyone():
+    outbound = OutboundScheduler(global_qps=1000, user_qps=1000, burst_seconds=1)
+    outbound.block("a", 30, user_scoped=True)
+    now = time.monotonic()
+    assert outbound.user_buckets["a"].wait_time(now) > 29
+    assert outbound.global_bucket.wait_time(now) == 0
+
+    outbound.block("a", 30, user_scoped=False)
+    assert outbound.global_bucket.wait_time(now) > 29
+
+
+@pytest.mark.parametrize("status, content, expected", [
+    (429, b"", "rateLimitExceeded"),
+    (403, _error(403, "userRateLimitExceeded"), "userRateLimitExceeded"),
+    (403, _error(403, "rateLimitExceeded"), "rateLimitExceeded"),
+    (403, _error(403, "insufficientFilePermissions"), None),
+    (403, b"not json", None),
+    (500, _error(500, "backendError"), None),
+    (200, b"{}", None),
+])
+def test_rate_limit_reason(status, content, expected):
+    assert rate_limit_reason(status, content) == expected
+
+
+def test_retry_delay_honours_retry_after_up_to_the_cap():
+    assert retry_delay(0, "2") == 2.0
+    assert retry_delay(0, "100000") == DRIVE_RETRY_MAX_DELAY
+    assert 0 <= retry_delay(3, "soon") <= DRIVE_RETRY_MAX_DELAY
+
+
+def test_uploads_default_to_bulk_priority():
+    assert current_priority(URI) == INTERACTIVE
+    assert current_priority("https://www.googleapis.com/upload/drive/v3/files") == BULK
+    with outbound_priority(BULK):
+        assert current_priority(URI) == BULK
+
+
+@pytest.mark.parametrize("method", ["GET", "POST"])
+def test_rate_limits_are_retried_for_every_method(scheduler, method):
+    upstream = Upstream((429, b""), (403, _error(403, "userRateLimitExceeded")))
+    status, _, _ = send_scheduled(upstream, "u", URI, method, b"{}")
+    assert status == 200
+    assert upstream.calls == 3
+
+
+@pytest.mark.parametrize("method", ["GET", "PUT", "DELETE"])
+def test_server_errors_are_retried_for_idempotent_methods(scheduler, method):
+    upstream = Upstream((503, b""), (500, b""))
+    assert send_scheduled(upstream, "u", URI, method)[0] == 200
+    assert upstream.calls == 3
+
+
+@pytest.mark.parametrize("method", ["POST", "PATCH"])
+def test_server_errors_are_not_retried_for_other_methods(scheduler, method):
+    upstream = Upstream((500, b""))
+    assert send_scheduled(upstream, "u", URI, method, b"{}")[0] == 500
+    assert upstream.calls == 1
+
+
+def test_streamed_bodies_are_never_retried(scheduler):
+    upstream = Upstream((429, b""))
+    assert send_scheduled(upstream, "u", URI, "PUT", iter([b"chunk"]))[0] == 429
+    assert upstream.calls == 1
+
+
+def test_other_errors_are_returned_as_is(scheduler):
+    upstream = Upstream((404, b""))
+    assert send_scheduled(upstream, "u", URI, "GET")[0] == 404
+    assert upstream.calls == 1
+
+
+def test_retries_stop_after_max_attempts(scheduler):
+    upstream = Upstream(*[(503, b"")] * (DRIVE_RETRY_MAX_ATTEMPTS + 2))
+    assert send_scheduled(upstream, "u", URI, "GET")[0] == 503
+    assert upstream.calls == DRIVE_RETRY_MAX_ATTEMPTS
+
+
+def test_project_rate_limit_blocks_everyone(scheduler):
+    send_scheduled(Upstream((403, _error(403, "rateLimitExceeded"))), "u", URI, "GET")
+    send_scheduled(Upstream((403, _error(403, "userRateLimitExceeded"))), "v", URI, "GET")
+    assert scheduler.global_bucket.blocked_until > 0
+    assert scheduler.user_buckets["v"].blocked_until > 0
+    assert scheduler.user_buckets["u"].blocked_until == 0
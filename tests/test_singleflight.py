@@ -0,0 +1,167 @@
+import threading
+import time
+import pytest
+from app import singleflight
+from app.singleflight import SingleFlight, SharedStreams
+
+CHUNK = 1000
+
+
+class Upstream:
+    """Chunk iterator factory that counts upstream calls, pulled chunks and closes."""
+
+    def __init__(self, chunks: int = 20, fail_at: int = None):
+        self.chunks = chunks
+        self.fail_at = fail_at
+        self.calls = 0
+        self.pulled = 0
+        self.closed = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self._iterate()
+
+    def _iterate(self):
+        try:
+            for index in range(self.chunks):
+                if index == self.fail_at:
+                    raise RuntimeError("upstream failed")
+                self.pulled += 1
+                yield bytes([index]) * CHUNK
+        finally:
+            self.closed += 1
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(bytes([index]) * CHUNK for index in range(self.chunks))
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_concurrent_calls_share_one_result():
+    flight, release, calls = SingleFlight("test"), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        release.wait()
+        return {"value": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: calls)
+    time.sleep(0.05)  # Let the followers join the call in flight
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 5
+
+
+def test_errors_are_shared_and_not_cached():
+    flight, release = SingleFlight("test"), threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    assert flight.do("k", lambda: "fresh") == "fresh"  # Nothing is remembered once the call finished
+
+
+def test_single_reader_is_pull_driven():
+    upstream = Upstream()
+    reader = SharedStreams("test").open("k", upstream, 20 * CHUNK)
+    next(reader), next(reader)
+    time.sleep(0.05)
+    assert upstream.pulled == 2  # Nothing is read ahead of the client
+    assert b"".join(reader) == upstream.body[2 * CHUNK:]
+
+
+def test_late_joiner_gets_the_whole_body_from_one_upstream_call():
+    streams, upstream = SharedStreams("test"), Upstream()
+    first = streams.open("k", upstream, 20 * CHUNK)
+    head = next(first) + next(first)
+    second = streams.open("k", upstream, 20 * CHUNK)
+    assert b"".join(second) == upstream.body
+    assert head + b"".join(first) == upstream.body
+    assert upstream.calls == 1
+    assert upstream.closed == 1
+
+
+def test_fast_reader_waits_for_the_slowest(monkeypatch):
+    monkeypatch.setattr(singleflight, "DRIVE_SHARED_DOWNLOAD_MAX_LEAD", 3 * CHUNK)
+    streams, upstream = SharedStreams("test"), Upstream()
+    slow = streams.open("k", upstream, 20 * CHUNK)
+    next(slow)
+    fast = streams.open("k", upstream, 20 * CHUNK)
+    received = []
+    thread = threading.Thread(target=lambda: received.extend(fast))
+    thread.start()
+    _wait_for(lambda: upstream.pulled >= 4)
+    time.sleep(0.05)
+    assert upstream.pulled == 4  # slow has read 1 chunk, so the lead stops at 3 more
+    rest = b"".join(slow)
+    thread.join()
+    assert b"".join(received) == upstream.body
+    assert bytes([0]) * CHUNK + rest == upstream.body
+
+
+def test_large_bodies_are_not_shared(monkeypatch):
+    monkeypatch.setattr(singleflight, "DRIVE_SHARED_DOWNLOAD_MAX_BYTES", 5 * CHUNK)
+    streams, upstream = SharedStreams("test"), Upstream()
+    first = streams.open("k", upstream, 20 * CHUNK)
+    second = streams.open("k", upstream, 20 * CHUNK)
+    assert b"".join(first) == b"".join(second) == upstream.body
+    assert upstream.calls == 2
+
+
+def test_disk_budget_is_shared_by_all_streams(monkeypatch):
+    monkeypatch.setattr(singleflight, "DRIVE_SHARED_DOWNLOAD_DISK_BYTES", 30 * CHUNK)
+    streams, first, second = SharedStreams("test"), Upstream(), Upstream()
+    streams.open("a", first, 20 * CHUNK)
+    streams.open("b", second, 20 * CHUNK)
+    assert "a" in streams._streams
+    assert "b" not in streams._streams  # Over budget: streamed directly
+
+
+def test_upstream_error_reaches_every_reader():
+    streams, upstream = SharedStreams("test"), Upstream(fail_at=3)
+    first = streams.open("k", upstream, 20 * CHUNK)
+    next(first)
+    second = streams.open("k", upstream, 20 * CHUNK)
+    for reader in (first, second):
+        with pytest.raises(RuntimeError):
+            b"".join(reader)
+    assert upstream.calls == 1
+
+
+def test_last_reader_leaving_closes_upstream():
+    streams, upstream = SharedStreams("test"), Upstream()
+    reader = streams.open("k", upstream, 20 * CHUNK)
+    next(reader)
+    reader.close()
+    assert upstream.closed == 1
+    assert streams._streams == {}
+    assert streams._reserved == {}
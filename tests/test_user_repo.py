@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.cache import TwoTierCache, MISSING
+from app.models.user_token import UserToken
+from app.repositories import user_repo
+from app.repositories.user_repo import get_user_token_async, get_user_google_token_async
+
+
+@pytest.fixture
+def token_cache(redis, monkeypatch):
+    fresh = TwoTierCache("test_user_token", maxsize=10, local_ttl=30, remote_ttl=300)
+    monkeypatch.setattr(user_repo, "token_cache", fresh)
+    return fresh
+
+
+async def _with_session(work):
+    """Run `work(db)` against a throwaway async SQLite database holding one user's token."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(UserToken.__table__.create)
+    try:
+        async with async_sessionmaker(bind=engine, expire_on_commit=False)() as db:
+            db.add(UserToken(
+                user_id="1", access_token="access-1", refresh_token="refresh-1",
+                expires_at=datetime.utcnow() + timedelta(hours=1),
+            ))
+            await db.commit()
+            return await work(db)
+    finally:
+        await engine.dispose()
+
+
+def test_async_lookup_reads_the_database_then_caches_without_the_refresh_token(token_cache, redis):
+    user_token = asyncio.run(_with_session(lambda db: get_user_token_async(db, "1")))
+    assert user_token.access_token == "access-1"
+
+    cached = token_cache.get_local("1")
+    assert cached["access_token"] == "access-1"
+    assert cached["has_refresh_token"] is True
+    assert "refresh_token" not in cached
+    assert b"refresh-1" not in redis.data["test_user_token:1"][0]
+
+
+def test_async_lookup_is_served_from_the_cache(token_cache):
+    token_cache.set_local("1", {
+        "user_id": "1", "access_token": "cached", "has_refresh_token": True, "expires_at": None, "created_at": None,
+    })
+    user_token = asyncio.run(_with_session(lambda db: get_user_token_async(db, "1")))
+    assert user_token.access_token == "cached"
+    assert user_token.has_refresh_token
+
+
+def test_async_lookup_caches_unknown_users_as_none(token_cache):
+    assert asyncio.run(_with_session(lambda db: get_user_google_token_async(db, "2"))) is None
+    assert token_cache.get_local("2") is None
+    assert token_cache.get_local("3") is MISSING